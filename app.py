@@ -1,12 +1,13 @@
 import streamlit as st
-import tempfile
 import os
+import io
 import time
 import base64
+import hashlib
 from dotenv import load_dotenv
 
 # Daily & Monthly pipelines
-from app.daily_pipeline import run_pipeline
+from app.daily_pipeline import build_daily_report, write_daily_report, write_date_range
 from app.monthly_pipeline import process_final
 
 # ================== ENV ==================
@@ -109,6 +110,59 @@ def animated_progress():
             bar.progress(current)
             time.sleep(0.02)
 
+# ================== RESULT CACHE ==================
+# Sonuçlar yüklenen dosyaların içerik hash'ine göre saklanır (LRU + TTL).
+# Aynı dosyalarla tekrar "Generate" / "Download" pipeline'ı yeniden çalıştırmaz.
+CACHE_TTL = 60 * 60      # saniye
+CACHE_ENTRIES = 16
+
+def file_digest(uploaded):
+    """Yüklenen dosyanın SHA-256'sı; aynı yükleme için bir kez hesaplanır."""
+    digests = st.session_state.setdefault("file_digests", {})
+    if uploaded.file_id not in digests:
+        digests[uploaded.file_id] = hashlib.sha256(uploaded.getvalue()).hexdigest()
+    return digests[uploaded.file_id]
+
+@st.cache_data(ttl=CACHE_TTL, max_entries=CACHE_ENTRIES, show_spinner=False)
+def cached_daily_frame(procare_digest, dhs_digest, _procare_file, _dhs_file):
+    return build_daily_report(
+        io.BytesIO(_procare_file.getvalue()),
+        io.BytesIO(_dhs_file.getvalue())
+    )
+
+@st.cache_data(ttl=CACHE_TTL, max_entries=CACHE_ENTRIES, show_spinner=False)
+def cached_daily_report(
+    procare_digest, dhs_digest, _procare_file, _dhs_file,
+    range_mode, start_date, end_date, sheet_per_day
+):
+    df, banner_rows = cached_daily_frame(procare_digest, dhs_digest, _procare_file, _dhs_file)
+
+    output = io.BytesIO()
+    if range_mode:
+        write_date_range(
+            output,
+            df,
+            banner_rows,
+            start_date=start_date,
+            end_date=end_date,
+            sheet_per_day=sheet_per_day
+        )
+    else:
+        write_daily_report(output, df, banner_rows)
+
+    return output.getvalue()
+
+@st.cache_data(ttl=CACHE_TTL, max_entries=CACHE_ENTRIES, show_spinner=False)
+def cached_monthly_report(
+    procare_digest, dhs_digest, auth_digest, _procare_file, _dhs_file, _auth_file
+):
+    output = process_final(
+        io.BytesIO(_procare_file.getvalue()),
+        io.BytesIO(_dhs_file.getvalue()),
+        io.BytesIO(_auth_file.getvalue())
+    )
+    return output.getvalue()
+
 # ================== LOGIN ==================
 def login():
     show_logo()
@@ -238,6 +292,15 @@ if st.session_state.page == "🐝 Daily Attendance":
     if dhs_file:
         st.success("✅ DHS file uploaded successfully")
 
+    range_mode = st.checkbox("📆 Reconcile a date range in one run")
+    if range_mode:
+        date_range = st.date_input("Date range (empty = every day in the files)", value=())
+        layout = st.radio(
+            "Report layout",
+            ["One sheet per day", "Single consolidated sheet"],
+            horizontal=True
+        )
+
     if st.button(
         "🚀 Generate Daily Report",
         type="primary",
@@ -250,27 +313,32 @@ if st.session_state.page == "🐝 Daily Attendance":
 
         st.session_state.is_processing = True
 
-        with tempfile.TemporaryDirectory() as tmpdir:
-            animated_progress()
-
-            procare_path = os.path.join(tmpdir, "procare.xlsx")
-            dhs_path = os.path.join(tmpdir, "dhs.xlsx")
-            output_path = os.path.join(tmpdir, "final_attendance.xlsx")
-
-            with open(procare_path, "wb") as f:
-                f.write(procare_file.read())
-            with open(dhs_path, "wb") as f:
-                f.write(dhs_file.read())
-
-            run_pipeline(procare_path, dhs_path, output_path)
+        animated_progress()
+
+        start_date = end_date = None
+        sheet_per_day = True
+        if range_mode:
+            start_date = date_range[0] if len(date_range) > 0 else None
+            end_date = date_range[1] if len(date_range) > 1 else None
+            sheet_per_day = layout == "One sheet per day"
+
+        report = cached_daily_report(
+            file_digest(procare_file),
+            file_digest(dhs_file),
+            procare_file,
+            dhs_file,
+            range_mode,
+            start_date,
+            end_date,
+            sheet_per_day
+        )
 
-            with open(output_path, "rb") as f:
-                st.success("Report generated!")
-                st.download_button(
-                    "⬇️ Download Report",
-                    data=f,
-                    file_name="daily_attendance.xlsx"
-                )
+        st.success("Report generated!")
+        st.download_button(
+            "⬇️ Download Report",
+            data=report,
+            file_name="daily_attendance.xlsx"
+        )
 
         st.session_state.is_processing = False
 
@@ -300,15 +368,16 @@ elif st.session_state.page == "📅 Monthly Reconciliation":
 
         st.session_state.is_processing = True
 
-        with tempfile.TemporaryDirectory() as tmpdir:
-
-            animated_progress()
+        animated_progress()
 
-            output = process_final(
-                procare_file,
-                dhs_file,
-                auth_file
-            )
+        output = cached_monthly_report(
+            file_digest(procare_file),
+            file_digest(dhs_file),
+            file_digest(auth_file),
+            procare_file,
+            dhs_file,
+            auth_file
+        )
 
         st.session_state.is_processing = False
 
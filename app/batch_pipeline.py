@@ -0,0 +1,188 @@
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+from app.daily_pipeline import run_pipeline
+
+# --------------------------------------------------
+# Çoklu merkez (site) için günlük rapor — her site ayrı process'te
+# --------------------------------------------------
+
+
+def discover_sites(directory):
+    """
+    directory/<site>/ klasörlerini tarar.
+    Her site klasöründe bir Procare (.xlsx) ve bir DHS (.xls) dosyası olmalı;
+    olmayan klasör batch'i durdurmaz, "error" ile döner (özette failed olur).
+    return: [{"site", "procare", "dhs", "error"}, ...]
+    """
+    sites = []
+
+    for name in sorted(os.listdir(directory)):
+        site_dir = os.path.join(directory, name)
+        if not os.path.isdir(site_dir):
+            continue
+
+        files = sorted(os.listdir(site_dir))
+        procare = [f for f in files if f.lower().endswith(".xlsx")]
+        dhs = [f for f in files if f.lower().endswith(".xls")]
+
+        if len(procare) != 1 or len(dhs) != 1:
+            sites.append({
+                "site": name,
+                "procare": None,
+                "dhs": None,
+                "error": f"{site_dir}: bir Procare (.xlsx) ve bir DHS (.xls) dosyası bekleniyor",
+            })
+            continue
+
+        sites.append({
+            "site": name,
+            "procare": os.path.join(site_dir, procare[0]),
+            "dhs": os.path.join(site_dir, dhs[0]),
+            "error": "",
+        })
+
+    return sites
+
+
+def load_manifest(path):
+    """
+    CSV manifest: site, procare, dhs kolonları.
+    Göreli yollar manifest dosyasının klasörüne göre çözülür.
+    """
+    manifest = pd.read_csv(path, dtype=str)
+    manifest.columns = manifest.columns.str.strip().str.lower()
+
+    base = os.path.dirname(os.path.abspath(path))
+    sites = []
+
+    for row in manifest.to_dict("records"):
+        sites.append({
+            "site": row["site"].strip(),
+            "procare": os.path.join(base, row["procare"].strip()),
+            "dhs": os.path.join(base, row["dhs"].strip()),
+        })
+
+    return sites
+
+
+def site_result(site, seconds, output, error):
+    return {
+        "site": site,
+        "status": "failed" if error else "ok",
+        "seconds": seconds,
+        "output": output,
+        "error": error,
+    }
+
+
+def print_result(result):
+    mark = "✔" if result["status"] == "ok" else "✘"
+    seconds = "" if result["seconds"] is None else f" ({result['seconds']}s)"
+    print(f"{mark} {result['site']}{seconds} {result['error']}")
+
+
+def run_site(site, procare_file, dhs_file, output_file, store=None):
+    """Tek site; worker process içinde çalışır, hatayı sonuç olarak döner."""
+    start = time.perf_counter()
+
+    try:
+        run_pipeline(procare_file, dhs_file, output_file, store=store)
+        error = ""
+    except Exception as exc:
+        output_file = ""
+        error = f"{type(exc).__name__}: {exc}"
+
+    return site_result(site, round(time.perf_counter() - start, 3), output_file, error)
+
+
+def run_batch(sites, output_dir, max_workers=None, store_dir=None):
+    """
+    Tüm siteleri ProcessPoolExecutor ile paralel çalıştırır.
+    sites: discover_sites / load_manifest çıktısı
+    max_workers: None → makinedeki çekirdek sayısı
+    store_dir: site başına swipe deposu (<site>.sqlite) klasörü; None → depo yok
+    return: site başına çıktı, süre ve hata içeren özet DataFrame
+
+    Hatalı site klasörleri çalıştırılmadan, çöken worker'lar (ör. OOM →
+    BrokenProcessPool) site bazında failed satırı olarak özete yazılır.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    if store_dir is not None:
+        os.makedirs(store_dir, exist_ok=True)
+
+    start = time.perf_counter()
+    results = []
+
+    for s in sites:
+        if s.get("error"):
+            result = site_result(s["site"], None, "", s["error"])
+            print_result(result)
+            results.append(result)
+
+    runnable = [s for s in sites if not s.get("error")]
+
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    max_workers = max(1, min(max_workers, len(runnable)))
+
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        futures = {
+            pool.submit(
+                run_site,
+                s["site"],
+                s["procare"],
+                s["dhs"],
+                os.path.join(output_dir, f"{s['site']}_daily_attendance.xlsx"),
+                os.path.join(store_dir, f"{s['site']}.sqlite") if store_dir else None,
+            ): s["site"]
+            for s in runnable
+        }
+
+        for future in as_completed(futures):
+            try:
+                result = future.result()
+            except Exception as exc:
+                result = site_result(futures[future], None, "", f"{type(exc).__name__}: {exc}")
+            print_result(result)
+            results.append(result)
+
+    summary = pd.DataFrame(
+        results,
+        columns=["site", "status", "seconds", "output", "error"]
+    ).sort_values("site").reset_index(drop=True)
+
+    failed = (summary["status"] == "failed").sum()
+    print(
+        f"✅ {len(summary) - failed}/{len(summary)} site tamamlandı, "
+        f"{max_workers} worker, toplam {time.perf_counter() - start:.1f}s"
+    )
+
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Honeybee daily batch (multi-site)")
+    parser.add_argument("sites", help="site klasörlerini içeren dizin veya CSV manifest")
+    parser.add_argument("output_dir", help="raporların yazılacağı klasör")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--store-dir", default=None, help="site başına DHS swipe deposu klasörü")
+    args = parser.parse_args()
+
+    if os.path.isdir(args.sites):
+        sites = discover_sites(args.sites)
+    else:
+        sites = load_manifest(args.sites)
+
+    summary = run_batch(
+        sites, args.output_dir, max_workers=args.workers, store_dir=args.store_dir
+    )
+    summary.to_csv(os.path.join(args.output_dir, "batch_summary.csv"), index=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,26 @@
+import numpy as np
 import pandas as pd
-from datetime import datetime
-from openpyxl import load_workbook
+from openpyxl import Workbook
 from openpyxl.styles import PatternFill
-from openpyxl.styles.fills import Fill, PatternFill
 from openpyxl.styles import Font
-from openpyxl.styles import Border, Side
 
 # from procare_processor import process_procare
 # from dhs_processor import process_dhs
 
 from app.procare_processor import process_procare
-from app.dhs_processor import process_dhs
+from app.read_excel_file import load_procare_workbook
+from app.dhs_processor import (
+    FLAG_B4,
+    FLAG_CARD_NOT_ACTIVE,
+    FLAG_DD,
+    FLAG_SA,
+    FLAGS_DTYPE,
+    combine_flags,
+    process_dhs,
+)
+from app.report_writer import save_workbook, write_sheet
+from app.swipe_store import ingest_swipes, load_daily, load_swipes, open_store, save_daily
+from app.time_utils import format_minutes, minutes
 
 # ================== COLORS ==================
 GREEN = PatternFill(start_color="C6EFCE", end_color="C6EFCE", fill_type="solid")
@@ -29,356 +39,455 @@ COLOR_MAP = {
     "Not Swiped BOTH": RED
 }
 
-THICK_BORDER = Border(
-    left=Side(style="medium"),
-    right=Side(style="medium"),
-    top=Side(style="medium"),
-    bottom=Side(style="medium"),
-)
-
-# ================== TIME HELPERS ==================
-def not_swiped_reason(p_in, p_out):
-    if not p_in and p_out:
-        return "Not Swiped IN"
-    if p_in and not p_out:
-        return "Not Swiped OUT"
-    return "Not Swiped BOTH"
-def parse_time(t):
-    try:
-        return datetime.strptime(t, "%H:%M").time()
-    except:
-        return None
-    
-# def auto_adjust_column_width(ws, padding=4):
-#     for col in ws.columns:
-#         max_length = 0
-#         col_letter = col[0].column_letter
-
-#         for cell in col:
-#             if cell.value:
-#                 max_length = max(max_length, len(str(cell.value)))
-
-#         ws.column_dimensions[col_letter].width = max_length + padding
-from openpyxl.utils import get_column_letter
-
-def auto_adjust_column_width(ws, padding=4):
-    for col_idx in range(1, ws.max_column + 1):
-
-        column_letter = get_column_letter(col_idx)
-        max_length = 0
-
-        for row in range(1, ws.max_row + 1):
-            cell = ws.cell(row=row, column=col_idx)
-
-            # merged hücreleri atla
-            if cell.coordinate in ws.merged_cells:
-                continue
-
-            if cell.value:
-                max_length = max(max_length, len(str(cell.value)))
-
-        ws.column_dimensions[column_letter].width = max_length + padding
-
-def in_range(t, start, end):
-    t = parse_time(t)
-    return bool(t) and start <= t <= end
-
 # ================== RESPONSE HELPERS ==================
-def is_sa(resp): return bool(resp) and "(00) S/A" in resp
-def is_b4(resp): return bool(resp) and "(B4)" in resp
-def is_dd(resp): return bool(resp) and "(DD)" in resp
-def is_card_not_active(resp): return bool(resp) and "Card Not Active" in resp
-
-# ================== DHS TIME PICKER ==================
-def pick_time_dhs(df, time_col, resp_col, pick):
-
-    df = df[~df[resp_col].apply(is_card_not_active)]
-
-    sa = df[df[resp_col].apply(is_sa)]
-    source = sa if not sa.empty else None
-
-    if source is None:
-        b4 = df[df[resp_col].apply(is_b4)]
-        source = b4 if not b4.empty else None
-
-    if source is None or source.empty:
-        return ""
-
-    times = [parse_time(t) for t in source[time_col] if t]
-    times = [t for t in times if t]
-
-    if not times:
-        return ""
-
-    chosen = min(times) if pick == "min" else max(times)
-    return chosen.strftime("%H:%M")
+# Response kodları process_dhs'te bir kez bayraklara çevrilir (FLAG_*);
+# burada metin aranmaz, bitler test edilir.
+def has_flag(flags, bit):
+    return (flags & bit) != 0
 
 # ================== SLOT WINDOWS ==================
-MORNING_START = parse_time("06:00")
-MORNING_END   = parse_time("07:50")
-AFTER_START   = parse_time("15:00")
-AFTER_END     = parse_time("18:30")
+MORNING_START = minutes("06:00")
+MORNING_END   = minutes("07:50")
+AFTER_START   = minutes("15:00")
+AFTER_END     = minutes("18:30")
+
+SLOT_COLUMNS = ["Morning_IN", "Morning_OUT", "Afternoon_IN", "Afternoon_OUT"]
+RESPONSE_COLUMNS = [f"{c}_Response" for c in SLOT_COLUMNS]
+FLAG_COLUMNS = [f"{c}_Flags" for c in SLOT_COLUMNS]
+
+def fill_text(df):
+    """Metin kolonlarındaki boşlukları "" yapar; saat (dakika) kolonları <NA> kalır."""
+    time_cols = [c for c in df.columns if c.removeprefix("DHS_") in SLOT_COLUMNS]
+    text_cols = df.columns.difference(
+        time_cols + FLAG_COLUMNS + ["_order", "_dhs_order", "_merge"]
+    )
+    for col in text_cols:
+        if isinstance(df[col].dtype, pd.CategoricalDtype) and "" not in df[col].cat.categories:
+            df[col] = df[col].cat.add_categories("")
+    df[text_cols] = df[text_cols].fillna("")
+    return df
+
+def shared_categories(*columns):
+    """
+    Anahtar kolonları strip edip AYNI kategorik dtype'a çevirir;
+    merge ve groupby string hash yerine kategori kodları üzerinden çalışır.
+    """
+    stripped = [col.astype(str).str.strip() for col in columns]
+    categories = pd.Index(pd.concat(stripped).unique()).sort_values()
+    dtype = pd.CategoricalDtype(categories)
+    return [col.astype(dtype) for col in stripped]
+
+# ================== DHS NORMALIZATION ==================
+def normalize_dhs(dhs_raw):
+    """
+    (StudentID, Date) başına tek DHS satırı üretir, grup başına Python callback yok.
+    Her slot için: Card Not Active satırları atılır, S/A varsa S/A, yoksa B4
+    satırları kaynak olur; IN için en erken, OUT için en geç saat seçilir.
+    Response kolonları grubun unique değerlerinin " | " ile birleşimidir,
+    Flags kolonları da aynı response'ların bayraklarının bit-OR'u.
+    """
+    keys = ["StudentID", "Date"]
+
+    # Boş export (sadece header / IN-OUT olmayan işlemler): response pivot'u
+    # yapılamaz; aynı şema boş döner, reconcile tüm Procare satırlarını
+    # Procare-only işaretler
+    if dhs_raw.empty:
+        dhs = dhs_raw[keys + ["FullName"] + SLOT_COLUMNS + RESPONSE_COLUMNS + FLAG_COLUMNS]
+        return dhs.astype({col: object for col in RESPONSE_COLUMNS}).reset_index(drop=True)
+
+    group_keys = [dhs_raw[k] for k in keys]
+
+    dhs = dhs_raw.groupby(keys, observed=True)["FullName"].first().to_frame()
+
+    # ---------- SLOT SAATLERİ ----------
+    for col in SLOT_COLUMNS:
+        flags = dhs_raw[f"{col}_Flags"]
+
+        priority = pd.Series(
+            np.select(
+                [
+                    has_flag(flags, FLAG_CARD_NOT_ACTIVE),
+                    has_flag(flags, FLAG_SA),
+                    has_flag(flags, FLAG_B4),
+                ],
+                [np.nan, 0, 1],
+                default=np.nan
+            ),
+            index=dhs_raw.index
+        )
+        best = priority.groupby(group_keys, observed=True).transform("min")
+
+        times = dhs_raw[col].where(priority == best)
+
+        grouped = times.groupby(group_keys, observed=True)
+        chosen = grouped.min() if col.endswith("_IN") else grouped.max()
+
+        dhs[col] = chosen
+
+    # ---------- RESPONSE BİRLEŞTİRME ----------
+    for col in RESPONSE_COLUMNS:
+        unique = dhs_raw[keys + [col]].drop_duplicates()
+        unique["_n"] = unique.groupby(keys, observed=True).cumcount()
+        wide = unique.pivot(index=keys, columns="_n", values=col).astype(object)
+
+        joined = wide[0]
+        for n in wide.columns[1:]:
+            joined = joined.where(wide[n].isna(), joined + " | " + wide[n])
+
+        dhs[col] = joined
+
+    for col in FLAG_COLUMNS:
+        dhs[col] = combine_flags(dhs_raw[col], group_keys)
+
+    return dhs.reset_index()
+
+# ================== SLOT DECISION TABLE ==================
+# Bir slotun (Morning / Afternoon) etiketi ve rengi. Kurallar yukarıdan
+# aşağıya denenir, İLK eşleşen kazanır; tüm satırlar tek np.select ile
+# değerlendirilir. Koşullar slot_facts kolonları üzerinden yazılır.
+# NOT_SWIPED → DHS IN / OUT durumuna göre Not Swiped IN / OUT / BOTH.
+NOT_SWIPED = "Not Swiped"
+
+SLOT_RULES = [
+    # (koşul, etiket, renk)
+    (lambda f: ~f.p_any & f.d_any,                 "Void Transaction",          YELLOW),
+    (lambda f: ~f.p_any & ~f.d_any,                "",                          None),
+    (lambda f: f.p_in & ~f.p_out & f.d_complete,   "Update Procare",            YELLOW),
+    (lambda f: ~f.p_complete & f.d_any,            "Void Transaction",          YELLOW),
+    (lambda f: ~f.p_complete & ~f.d_any,           NOT_SWIPED,                  RED),
+    (lambda f: f.p_complete & f.dd_only,           NOT_SWIPED,                  RED),
+    (lambda f: f.p_complete & ~f.d_complete,       NOT_SWIPED,                  RED),
+    (lambda f: f.valid & f.any_b4,                 "Inform Parent",             YELLOW),
+    (lambda f: f.valid & ~f.any_b4,                "Swiped",                    GREEN),
+    (lambda f: ~f.valid,                           "Void & Update Transaction", YELLOW),
+]
+
+SLOT_FACTS = ["p_in", "p_out", "d_in", "d_out", "dd_only", "any_b4", "valid"]
+
+def slot_facts(p_in, p_out, d_in, d_out, dd_only, any_b4, valid):
+    """Temel bool kolonlar → kuralların kullandığı türetilmiş kolonlar"""
+    return pd.DataFrame({
+        "p_in": p_in, "p_out": p_out,
+        "d_in": d_in, "d_out": d_out,
+        "p_any": p_in | p_out, "p_complete": p_in & p_out,
+        "d_any": d_in | d_out, "d_complete": d_in & d_out,
+        "dd_only": dd_only, "any_b4": any_b4,
+        "valid": valid,
+    })
+
+def match_rules(facts):
+    """Her satır için ilk eşleşen kuralın sırası; eşleşmeyen → -1"""
+    conditions = [np.asarray(rule(facts), dtype=bool) for rule, _, _ in SLOT_RULES]
+    return np.select(conditions, range(len(SLOT_RULES)), default=-1)
+
+def uncovered_cases():
+    """
+    Tablonun kapsamadığı temel girdi kombinasyonları (2^7 olasılığın hepsi
+    denenir, mümkün olmayanlar dahil). Boş liste → tablo eksiksiz.
+    """
+    grid = pd.MultiIndex.from_product([[False, True]] * len(SLOT_FACTS), names=SLOT_FACTS)
+    base = grid.to_frame(index=False)
+    facts = slot_facts(*(base[c] for c in SLOT_FACTS))
+
+    return base[match_rules(facts) == -1].to_dict("records")
+
+if uncovered_cases():
+    raise ValueError("SLOT_RULES bazı durumları kapsamıyor")
+
+def process_slots(
+    p_in, p_out,
+    d_in, d_out,
+    in_resp, out_resp,
+    in_flags, out_flags,
+    start, end
+):
+    """
+    Bir slotu TÜM satırlar için değerlendirir.
+    p_* / d_*: Procare / DHS saatleri (dakika, <NA>)
+    in_resp / out_resp: DHS response metinleri, *_flags: bayrakları
+    return: (etiket, renk, final IN, final OUT) kolonları
+    """
+    has_p_in, has_p_out = p_in.notna(), p_out.notna()
+    has_d_in, has_d_out = d_in.notna(), d_out.notna()
+
+    # Boş response'lar DD sayılır (eski all(... if r) davranışı)
+    dd_only = (
+        ((in_resp == "") | has_flag(in_flags, FLAG_DD))
+        & ((out_resp == "") | has_flag(out_flags, FLAG_DD))
+    )
+    any_b4 = has_flag(in_flags | out_flags, FLAG_B4)
+    valid = (
+        p_in.between(start, end).fillna(False).astype(bool)
+        & p_out.between(start, end).fillna(False).astype(bool)
+    )
+
+    facts = slot_facts(has_p_in, has_p_out, has_d_in, has_d_out, dd_only, any_b4, valid)
+    rule = match_rules(facts)
+
+    labels = np.array([label for _, label, _ in SLOT_RULES], dtype=object)[rule]
+    colors = np.array([color for _, _, color in SLOT_RULES], dtype=object)[rule]
+
+    reason = np.select(
+        [~has_d_in & has_d_out, has_d_in & ~has_d_out],
+        ["Not Swiped IN", "Not Swiped OUT"],
+        default="Not Swiped BOTH"
+    )
+    labels = np.where(labels == NOT_SWIPED, reason, labels)
+
+    # Procare saati varsa o, yoksa DHS (ikisi de yoksa <NA>)
+    return labels, colors, p_in.fillna(d_in), p_out.fillna(d_out)
+
+# ================== REPORT FILLS ==================
+def slot_fills(response, color):
+    """
+    Bir slotun IN / OUT hücre renkleri.
+    Not Swiped IN / OUT / BOTH: eksik taraf kırmızı, olan taraf yeşil.
+    """
+    if response == "Not Swiped IN":
+        return RED, GREEN
+    if response == "Not Swiped OUT":
+        return GREEN, RED
+    if response == "Not Swiped BOTH":
+        return RED, RED
+    if color:
+        return color, color
+    return None, None
+
+# ================== RECONCILIATION ==================
+def reconcile(procare, dhs):
+    """
+    Procare ve DHS'i (StudentID, Date) üzerinde tek bir outer join ile eşler.
+    _merge kolonu: left_only = sadece Procare, right_only = sadece DHS, both = iki taraf.
+    Satır sırası eski döngüyle aynı: önce Procare sırası, sonra DHS ONLY satırları.
+    DHS ONLY satırları da aynı karar tablosundan geçer (Procare saati yok →
+    DHS saati varsa Void Transaction, yoksa boş).
+    """
+    p = procare.rename(columns={"Attdate": "Date"}).reindex(
+        columns=["Full Name", "StudentID", "Date", *SLOT_COLUMNS]
+    )
+    p["_order"] = range(len(p))
+
+    d = dhs.reindex(
+        columns=[
+            "StudentID", "Date", "FullName",
+            *SLOT_COLUMNS, *RESPONSE_COLUMNS, *FLAG_COLUMNS,
+        ]
+    ).rename(columns={c: f"DHS_{c}" for c in SLOT_COLUMNS})
+    d["_dhs_order"] = range(len(d))
+
+    merged = p.merge(d, on=["StudentID", "Date"], how="outer", indicator=True)
+
+    dhs_only = merged["_merge"] == "right_only"
+    merged["_order"] = merged["_order"].where(~dhs_only, len(p) + merged["_dhs_order"])
+    merged = merged.sort_values("_order", kind="stable").reset_index(drop=True)
+
+    merged = fill_text(merged)
+    merged[FLAG_COLUMNS] = merged[FLAG_COLUMNS].fillna(0).astype(FLAGS_DTYPE)
+
+    out = pd.DataFrame({
+        "Full Name": merged["Full Name"].astype(object).where(
+            merged["_merge"] != "right_only", merged["FullName"].astype(object)
+        ),
+        "StudentID": merged["StudentID"],
+        "Date": merged["Date"],
+    })
+
+    windows = {"Morning": (MORNING_START, MORNING_END), "Afternoon": (AFTER_START, AFTER_END)}
+    for slot, (start, end) in windows.items():
+        label, color, final_in, final_out = process_slots(
+            merged[f"{slot}_IN"], merged[f"{slot}_OUT"],
+            merged[f"DHS_{slot}_IN"], merged[f"DHS_{slot}_OUT"],
+            merged[f"{slot}_IN_Response"], merged[f"{slot}_OUT_Response"],
+            merged[f"{slot}_IN_Flags"], merged[f"{slot}_OUT_Flags"],
+            start, end
+        )
+        out[f"{slot}_IN"] = final_in
+        out[f"{slot}_OUT"] = final_out
+        out[f"{slot}_Response"] = label
+        out[f"{slot[0]}_Color"] = color
+
+    return out[[
+        "Full Name", "StudentID", "Date",
+        "Morning_IN", "Morning_OUT", "Morning_Response",
+        "Afternoon_IN", "Afternoon_OUT", "Afternoon_Response",
+        "M_Color", "A_Color",
+    ]]
+
+# ================== REPORT SHEET ==================
+def write_daily_sheet(wb, title, df, banner_rows):
+    """Eşlenmiş satırları (saatler dakika) renkleriyle bir sayfaya yazar."""
+    df = df.reset_index(drop=True)
+
+    for col in SLOT_COLUMNS:
+        df[col] = format_minutes(df[col])
+
+    fills = {}
+    for slot, color_col in (("Morning", "M_Color"), ("Afternoon", "A_Color")):
+        responses = df[f"{slot}_Response"]
+        pairs = [slot_fills(r, c) for r, c in zip(responses, df[color_col])]
+
+        fills[f"{slot}_IN"] = [p[0] for p in pairs]
+        fills[f"{slot}_OUT"] = [p[1] for p in pairs]
+        fills[f"{slot}_Response"] = [COLOR_MAP.get(r) for r in responses]
+
+    write_sheet(
+        wb,
+        title,
+        df.drop(columns=["M_Color", "A_Color"]),
+        banner_rows=banner_rows,
+        merge_width=9,
+        fills=fills,
+        banner_font=Font(bold=True),
+        padding=4
+    )
 
 # ==================================================
-# 🔥 MAIN ORCHESTRATION FUNCTION
+# 🔥 MAIN ORCHESTRATION FUNCTIONS
 # ==================================================
-def run_pipeline(
-    procare_file,
-    dhs_file,
-    output_file
-):
-    # ---------- READ EXCELS (SADECE BURADA) ----------
-    procare_top_rows = pd.read_excel(procare_file, header=None, nrows=3)
-    procare_header = pd.read_excel(procare_file, header=None).iloc[0, 0]
-    df_procare_raw = pd.read_excel(procare_file, header=8)
-
-    df_dhs_raw = pd.read_excel(dhs_file, dtype=str)
-
-    # ---------- PROCESS ----------
-    procare = process_procare(df_procare_raw, procare_header).fillna("")
-    dhs_raw = process_dhs(df_dhs_raw).fillna("")
-
-    # ---------- NORMALIZE ----------
-    procare["StudentID"] = procare["StudentID"].astype(str).str.strip()
-    procare["Attdate"] = procare["Attdate"].astype(str).str.strip()
-
-    dhs_raw["StudentID"] = dhs_raw["StudentID"].astype(str).str.strip()
-    dhs_raw["Date"] = dhs_raw["Date"].astype(str).str.strip()
-
-    # ---------- NORMALIZE DHS ----------
-    dhs_rows = []
-
-    for (sid, date), g in dhs_raw.groupby(["StudentID", "Date"]):
-        dhs_rows.append({
-            "StudentID": sid,
-            "Date": date,
-            "FullName": g.iloc[0]["FullName"],
-
-            "Morning_IN": pick_time_dhs(g, "Morning_IN", "Morning_IN_Response", "min"),
-            "Morning_OUT": pick_time_dhs(g, "Morning_OUT", "Morning_OUT_Response", "max"),
-
-            "Afternoon_IN": pick_time_dhs(g, "Afternoon_IN", "Afternoon_IN_Response", "min"),
-            "Afternoon_OUT": pick_time_dhs(g, "Afternoon_OUT", "Afternoon_OUT_Response", "max"),
-
-            "Morning_IN_Response": " | ".join(g["Morning_IN_Response"].unique()),
-            "Morning_OUT_Response": " | ".join(g["Morning_OUT_Response"].unique()),
-            "Afternoon_IN_Response": " | ".join(g["Afternoon_IN_Response"].unique()),
-            "Afternoon_OUT_Response": " | ".join(g["Afternoon_OUT_Response"].unique()),
-        })
+def prepare_dhs(df_dhs_raw):
+    """Ham DHS export → normalize_dhs girdisi (process_dhs + strip edilmiş anahtarlar)"""
+    dhs_raw = fill_text(process_dhs(df_dhs_raw))
+    dhs_raw["StudentID"] = shared_categories(dhs_raw["StudentID"])[0]
+    dhs_raw["Date"] = shared_categories(dhs_raw["Date"])[0]
+    return dhs_raw
+
+
+def stored_dhs(store, df_dhs_raw):
+    """
+    Export'u swipe deposuna ekler ve export'un günlerinin normalize DHS
+    satırlarını depodan döner. Sadece yeni işlemlerin dokunduğu
+    (StudentID, Date) anahtarları tüm işlemleriyle yeniden hesaplanır.
+    store: SQLite dosya yolu
+    """
+    conn = open_store(store)
 
-    dhs = pd.DataFrame(dhs_rows)
-
-    # ---------- SLOT LOGIC ----------
-    def process_slot(p_row, d_row, slot, start, end):
-        p_in = p_row.get(f"{slot}_IN", "")
-        p_out = p_row.get(f"{slot}_OUT", "")
-
-        d_in = d_out = ""
-        if d_row is not None:
-            d_in = d_row.get(f"{slot}_IN", "")
-            d_out = d_row.get(f"{slot}_OUT", "")
-
-        final_in = p_in if p_in else d_in
-        final_out = p_out if p_out else d_out
-
-        has_procare_any = bool(p_in or p_out)
-        has_procare_complete = bool(p_in and p_out)
-        has_dhs_any = bool(d_in or d_out)
-        has_dhs_complete = bool(d_in and d_out)
-
-        if not has_procare_any:
-            if has_dhs_any:
-                return "Void Transaction", YELLOW, final_in, final_out
-            return "", None, "", ""
-
-        if p_in and not p_out and has_dhs_complete:
-            return "Update Procare", YELLOW, final_in, final_out
-
-        # if has_procare_any and not has_procare_complete:
-        #     if has_dhs_any:
-        #         return "Void Transaction", YELLOW, final_in, final_out
-        #     return "Not Swiped", RED, final_in, final_out
-
-        if has_procare_any and not has_procare_complete:
-            if has_dhs_any:
-                return "Void Transaction", YELLOW, final_in, final_out
-
-            return not_swiped_reason(d_in, d_out), RED, final_in, final_out
-
-
-        responses = []
-        if d_row is not None:
-            responses = [
-                d_row.get(f"{slot}_IN_Response", ""),
-                d_row.get(f"{slot}_OUT_Response", "")
-            ]
-
-        if all(is_dd(r) for r in responses if r):
-            return not_swiped_reason(d_in, d_out), RED, final_in, final_out
-
-        if not has_dhs_complete:
-            return not_swiped_reason(d_in, d_out), RED, final_in, final_out
-
-        valid = in_range(p_in, start, end) and in_range(p_out, start, end)
-
-        if valid:
-            if any(is_b4(r) for r in responses):
-                return "Inform Parent", YELLOW, final_in, final_out
-            return "Swiped", GREEN, final_in, final_out
-
-        return "Void & Update Transaction", YELLOW, final_in, final_out
-
-    # ---------- MAIN LOOP ----------
-    rows = []
-    processed = set()
-
-    for _, p in procare.iterrows():
-        sid, date = p["StudentID"], p["Attdate"]
-        d_match = dhs[(dhs["StudentID"] == sid) & (dhs["Date"] == date)]
-        d_row = d_match.iloc[0] if not d_match.empty else None
-
-        m = process_slot(p, d_row, "Morning", MORNING_START, MORNING_END)
-        a = process_slot(p, d_row, "Afternoon", AFTER_START, AFTER_END)
-
-        rows.append({
-            "Full Name": p["Full Name"],
-            "StudentID": sid,
-            "Date": date,
-            "Morning_IN": m[2],
-            "Morning_OUT": m[3],
-            "Morning_Response": m[0],
-            "Afternoon_IN": a[2],
-            "Afternoon_OUT": a[3],
-            "Afternoon_Response": a[0],
-            "M_Color": m[1],
-            "A_Color": a[1]
-        })
-
-        processed.add((sid, date))
+    try:
+        new, dates = ingest_swipes(conn, df_dhs_raw)
 
-    # ---------- DHS ONLY ----------
-    # ---------- DHS ONLY (ORİJİNAL DAVRANIŞ KORUNDU) ----------
-    for _, d in dhs.iterrows():
-        key = (d["StudentID"], d["Date"])
-        if key in processed:
-            continue
+        touched = new[["StudentID", "Date"]].dropna().drop_duplicates()
+        if len(touched):
+            swipes = load_swipes(conn, touched)
+            save_daily(conn, touched, normalize_dhs(prepare_dhs(swipes)))
 
-        has_morning = bool(d["Morning_IN"] or d["Morning_OUT"])
-        has_afternoon = bool(d["Afternoon_IN"] or d["Afternoon_OUT"])
+        return load_daily(conn, dates)
+    finally:
+        conn.close()
 
-        rows.append({
-            "Full Name": d["FullName"],
-            "StudentID": d["StudentID"],
-            "Date": d["Date"],
 
-            "Morning_IN": d["Morning_IN"] if has_morning else "",
-            "Morning_OUT": d["Morning_OUT"] if has_morning else "",
-            "Morning_Response": "Void Transaction" if has_morning else "",
+def build_daily_report(procare_file, dhs_file, store=None):
+    """
+    Procare ve DHS dosyalarını BİR KEZ okur, işler ve eşler.
+    store: swipe deposu (SQLite yolu); None → DHS export'un tamamı işlenir
+    return: (rapor satırları DataFrame'i, Procare banner satırları)
+    """
+    # ---------- READ EXCELS (SADECE BURADA) ----------
+    procare_header, procare_top_rows, df_procare_raw = load_procare_workbook(procare_file)
 
-            "Afternoon_IN": d["Afternoon_IN"] if has_afternoon else "",
-            "Afternoon_OUT": d["Afternoon_OUT"] if has_afternoon else "",
-            "Afternoon_Response": "Void Transaction" if has_afternoon else "",
+    df_dhs_raw = pd.read_excel(dhs_file, dtype=str)
 
-            "M_Color": YELLOW if has_morning else None,
-            "A_Color": YELLOW if has_afternoon else None
-        })
+    # ---------- PROCESS ----------
+    procare = fill_text(process_procare(df_procare_raw, procare_header))
 
+    if store is None:
+        dhs = normalize_dhs(prepare_dhs(df_dhs_raw))
+    else:
+        dhs = fill_text(stored_dhs(store, df_dhs_raw))
 
-    # ---------- WRITE FINAL ----------
-    df = pd.DataFrame(rows)
+    # ---------- NORMALIZE ----------
+    procare["StudentID"], dhs["StudentID"] = shared_categories(
+        procare["StudentID"], dhs["StudentID"]
+    )
+    procare["Attdate"], dhs["Date"] = shared_categories(
+        procare["Attdate"], dhs["Date"]
+    )
+
+    # ---------- RECONCILE ----------
+    df = reconcile(procare, dhs)
     df = df.sort_values(by="Full Name", kind="stable").reset_index(drop=True)
 
-    df.drop(columns=["M_Color", "A_Color"]).to_excel(output_file, index=False)
-
-    wb = load_workbook(output_file)
-    ws = wb.active
-
-    for i, row in df.iterrows():
-        r = i + 2
-
-        # ===== MORNING =====
-        mr = row["Morning_Response"]
-
-        if mr == "Not Swiped IN":
-            ws[f"D{r}"].fill = RED      # IN
-            ws[f"E{r}"].fill = GREEN    # OUT
-
-        elif mr == "Not Swiped OUT":
-            ws[f"D{r}"].fill = GREEN
-            ws[f"E{r}"].fill = RED
-
-        elif mr == "Not Swiped BOTH":
-            ws[f"D{r}"].fill = RED
-            ws[f"E{r}"].fill = RED
-
-        else:
-            if row["M_Color"]:
-                ws[f"D{r}"].fill = row["M_Color"]
-                ws[f"E{r}"].fill = row["M_Color"]
+    return df, procare_top_rows.values.tolist()
 
-        if mr in COLOR_MAP:
-            ws[f"F{r}"].fill = COLOR_MAP[mr]
 
+def write_daily_report(output_file, df, banner_rows):
+    wb = Workbook(write_only=True)
+    write_daily_sheet(wb, "Sheet1", df, banner_rows)
+    save_workbook(wb, output_file)
 
-        # ===== AFTERNOON =====
-        ar = row["Afternoon_Response"]
 
-        if ar == "Not Swiped IN":
-            ws[f"G{r}"].fill = RED
-            ws[f"H{r}"].fill = GREEN
+def write_date_range(
+    output_file,
+    df,
+    banner_rows,
+    start_date=None,
+    end_date=None,
+    sheet_per_day=True
+):
+    """
+    build_daily_report çıktısını tarih aralığına göre yazar.
+    start_date / end_date: None → dosyadaki ilk / son gün
+    sheet_per_day: True → her gün ayrı sayfa (MM-DD-YYYY),
+                   False → tek birleşik sayfa (isim, tarih sırasıyla)
+    return: rapora giren günler
+    """
+    dates = pd.to_datetime(df["Date"], format="%m/%d/%Y", errors="coerce")
 
-        elif ar == "Not Swiped OUT":
-            ws[f"G{r}"].fill = GREEN
-            ws[f"H{r}"].fill = RED
+    keep = dates.notna()
+    if start_date is not None:
+        keep &= dates >= pd.Timestamp(start_date)
+    if end_date is not None:
+        keep &= dates <= pd.Timestamp(end_date)
 
-        elif ar == "Not Swiped BOTH":
-            ws[f"G{r}"].fill = RED
-            ws[f"H{r}"].fill = RED
+    df = df[keep]
+    dates = dates[keep]
+    days = sorted(dates.unique())
 
-        else:
-            if row["A_Color"]:
-                ws[f"G{r}"].fill = row["A_Color"]
-                ws[f"H{r}"].fill = row["A_Color"]
+    wb = Workbook(write_only=True)
 
-        if ar in COLOR_MAP:
-            ws[f"I{r}"].fill = COLOR_MAP[ar]
+    if sheet_per_day:
+        for day in days:
+            write_daily_sheet(wb, day.strftime("%m-%d-%Y"), df[dates == day], banner_rows)
+    else:
+        order = pd.DataFrame({"name": df["Full Name"], "date": dates})
+        df = df.loc[order.sort_values(["name", "date"], kind="stable").index]
+        write_daily_sheet(wb, "Sheet1", df, banner_rows)
 
+    save_workbook(wb, output_file)
 
-    # ===== APPLY THICK BORDERS =====
-    for row in ws.iter_rows(
-        min_row=1,
-        max_row=ws.max_row,
-        min_col=1,
-        max_col=ws.max_column
-    ):
-        for cell in row:
-            cell.border = THICK_BORDER
-            
-    ws.insert_rows(1, amount=3)
+    return [day.strftime("%m/%d/%Y") for day in days]
 
-    bold_font = Font(bold=True)
 
-    # procare ilk 3 satırı yaz + bold
-    for r in range(3):
-        for c, val in enumerate(procare_top_rows.iloc[r]):
-            cell = ws.cell(row=r + 1, column=c + 1, value=val)
-            cell.font = bold_font
-    
-    from openpyxl.styles import Alignment
+def run_pipeline(
+    procare_file,
+    dhs_file,
+    output_file,
+    store=None
+):
+    df, banner_rows = build_daily_report(procare_file, dhs_file, store=store)
 
-    # ===== MERGE + CENTER FIRST 3 ROWS (A-H) =====
-    for row_idx in range(1, 4):
-        ws.merge_cells(start_row=row_idx, start_column=1, end_row=row_idx, end_column=9)
-        ws.cell(row=row_idx, column=1).alignment = Alignment(horizontal="center", vertical="center")
-    
-    
-    auto_adjust_column_width(ws, padding=4)
+    # ---------- WRITE FINAL ----------
+    write_daily_report(output_file, df, banner_rows)
 
-    # Fix for Python 3.14 + openpyxl compatibility
 
-    wb._fills = [
-        f if isinstance(f, Fill) else PatternFill()
-        for f in wb._fills
-    ]
-            
-    wb.save(output_file)
+def run_date_range(
+    procare_file,
+    dhs_file,
+    output_file,
+    start_date=None,
+    end_date=None,
+    sheet_per_day=True,
+    store=None
+):
+    """
+    Bir tarih aralığını TEK ÇAĞRIDA eşler; Procare ve DHS bir kez okunur.
+    Argümanlar ve dönüş değeri için: write_date_range, build_daily_report
+    """
+    df, banner_rows = build_daily_report(procare_file, dhs_file, store=store)
+
+    return write_date_range(
+        output_file,
+        df,
+        banner_rows,
+        start_date=start_date,
+        end_date=end_date,
+        sheet_per_day=sheet_per_day
+    )
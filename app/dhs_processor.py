@@ -1,20 +1,88 @@
+import numpy as np
 import pandas as pd
 
+from app.time_utils import MINUTES_DTYPE, datetime_minutes
+
 # --------------------------------------------------
 # Response seçme kuralı (DEĞİŞMEDİ)
+# Tek kayıt varsa olduğu gibi; birden fazlaysa ilk (00) S/A,
+# yoksa ilk kayıt. → S/A önceliği + stabil sıralama + grubun ilki
+# (first(skipna=False): ilk response NaN ise NaN kalır, pandas >= 2.2.1)
+# --------------------------------------------------
+SA_PATTERN = r"\(00\)\s*S/A"
+
 # --------------------------------------------------
-def pick_response(series):
-    # Tek kayıt varsa olduğu gibi
-    if len(series) == 1:
-        return series.iloc[0]
+# Response kodları → bit bayrakları (response başına TEK parse)
+# FLAG_SA: "(00) S/A" tam yazım (günlük eşleme kuralı)
+# FLAG_SA_ANY: SA_PATTERN, boşluksuz "(00)S/A" dahil (response seçimi)
+# FLAG_OTHER: yukarıdakiler dışındaki "(XX)" kodları
+# --------------------------------------------------
+FLAG_SA = 1
+FLAG_SA_ANY = 2
+FLAG_B4 = 4
+FLAG_DD = 8
+FLAG_CARD_NOT_ACTIVE = 16
+FLAG_OTHER = 32
+
+RESPONSE_FLAGS = [
+    (FLAG_SA, r"\(00\) S/A"),
+    (FLAG_SA_ANY, SA_PATTERN),
+    (FLAG_B4, r"\(B4\)"),
+    (FLAG_DD, r"\(DD\)"),
+    (FLAG_CARD_NOT_ACTIVE, r"Card Not Active"),
+    (FLAG_OTHER, r"\((?!00\)|B4\)|DD\))[^()\s]+\)"),
+]
+FLAGS_DTYPE = "uint8"
+
+# --------------------------------------------------
+# Kompakt dtype'lar: tekrar eden metinler category (hücre başına string yok,
+# groupby kodlar üzerinden), saat int8, dakika Int16
+# --------------------------------------------------
+RAW_CATEGORY_COLUMNS = ["Person Name", "Case #", "Person", "Trans Type", "Response"]
+PERIOD_DTYPE = pd.CategoricalDtype(["Afternoon", "Morning"])
+DIRECTION_DTYPE = pd.CategoricalDtype(["IN", "OUT"])
+
+TIME_COLUMNS = [
+    "Afternoon_IN", "Afternoon_OUT",
+    "Morning_IN", "Morning_OUT",
+]
+RESPONSE_COLUMNS = [f"{c}_Response" for c in TIME_COLUMNS]
+FLAG_COLUMNS = [f"{c}_Flags" for c in TIME_COLUMNS]
+
 
-    # Birden fazla varsa ve (00) S/A varsa → onu seç
-    sa = series[series.str.contains(r"\(00\)\s*S/A", na=False)]
-    if not sa.empty:
-        return sa.iloc[0]
+def parse_flags(responses):
+    """Response metinleri → bayrak Series'i (NaN / "" → 0)"""
+    flags = pd.Series(0, index=responses.index, dtype=FLAGS_DTYPE)
+    for bit, pattern in RESPONSE_FLAGS:
+        found = responses.str.contains(pattern, na=False).astype(bool)
+        flags |= np.where(found, bit, 0).astype(FLAGS_DTYPE)
+    return flags
 
-    # Diğer durumlarda olduğu gibi (ilk)
-    return series.iloc[0]
+
+def response_flags(response):
+    """
+    Kategorik Response kolonu → satır başına bayraklar.
+    Regex'ler sadece unique response'lar üzerinde çalışır.
+    Eksik response (kod -1) → 0; kolon tamamen boşsa kategori de yoktur.
+    """
+    per_category = parse_flags(pd.Series(response.cat.categories)).to_numpy()
+    codes = response.cat.codes.to_numpy()
+
+    flags = np.zeros(len(codes), dtype=FLAGS_DTYPE)
+    present = codes >= 0
+    flags[present] = per_category[codes[present]]
+
+    return pd.Series(flags, index=response.index)
+
+
+def combine_flags(flags, by):
+    """Gruptaki bayrakların bit-OR'u (bit başına tek groupby max)"""
+    combined = None
+    for bit, _ in RESPONSE_FLAGS:
+        has_bit = (flags & bit).astype(bool).groupby(by, observed=True).max()
+        part = has_bit.astype(FLAGS_DTYPE) * bit
+        combined = part if combined is None else combined | part
+    return combined.astype(FLAGS_DTYPE)
 
 
 def process_dhs(df_raw: pd.DataFrame) -> pd.DataFrame:
@@ -24,11 +92,16 @@ def process_dhs(df_raw: pd.DataFrame) -> pd.DataFrame:
     df = df_raw.copy()
     df.columns = df.columns.str.strip()
 
+    # string işlemleri category'lerde unique değer başına bir kez çalışır
+    df[RAW_CATEGORY_COLUMNS] = df[RAW_CATEGORY_COLUMNS].astype("category")
+
     # --------------------------------------------------
     # 2️⃣ FullName ve StudentID
     # --------------------------------------------------
-    df["FullName"] = df["Person Name"].str.strip()
-    df["StudentID"] = df["Case #"].str.strip() + "/" + df["Person"]
+    df["FullName"] = df["Person Name"].str.strip().astype("category")
+    df["StudentID"] = (
+        df["Case #"].str.strip() + "/" + df["Person"].astype(object)
+    ).astype("category")
 
     # --------------------------------------------------
     # 3️⃣ DateTime parse
@@ -36,88 +109,71 @@ def process_dhs(df_raw: pd.DataFrame) -> pd.DataFrame:
     df["DateTime"] = pd.to_datetime(df["Date Time"], errors="coerce")
     df = df[df["DateTime"].notna()]
 
-    df["Date"] = df["DateTime"].dt.strftime("%m/%d/%Y")
-    df["Hour"] = df["DateTime"].dt.hour
-    df["Time"] = df["DateTime"].dt.strftime("%H:%M")
+    df["Date"] = df["DateTime"].dt.strftime("%m/%d/%Y").astype("category")
+    df["Hour"] = df["DateTime"].dt.hour.astype("int8")
+    df["Time"] = datetime_minutes(df["DateTime"])
 
     # --------------------------------------------------
     # 4️⃣ Morning / Afternoon
     # --------------------------------------------------
-    df["Period"] = df["Hour"].apply(lambda x: "Morning" if x < 12 else "Afternoon")
+    df["Period"] = pd.Categorical.from_codes(
+        (df["Hour"] < 12).astype("int8"), dtype=PERIOD_DTYPE
+    )
 
     # --------------------------------------------------
-    # 5️⃣ Trans Type normalize (IN / OUT)
+    # 5️⃣ Trans Type normalize (IN / OUT) — OUT, IN'i ezer
     # --------------------------------------------------
-    df["Trans_Clean"] = None
-    df.loc[df["Trans Type"].str.contains("IN", case=False, na=False), "Trans_Clean"] = "IN"
-    df.loc[df["Trans Type"].str.contains("OUT", case=False, na=False), "Trans_Clean"] = "OUT"
+    is_in = df["Trans Type"].str.contains("IN", case=False, na=False).astype(bool)
+    is_out = df["Trans Type"].str.contains("OUT", case=False, na=False).astype(bool)
+    df["Trans_Clean"] = pd.Categorical.from_codes(
+        np.select([is_out, is_in], [1, 0], default=-1), dtype=DIRECTION_DTYPE
+    )
 
     # Geçersizleri at
     df = df[df["Trans_Clean"].notna()]
 
     # --------------------------------------------------
-    # 6️⃣ Kolon isimleri
-    # --------------------------------------------------
-    df["Time_Column"] = df["Period"] + "_" + df["Trans_Clean"]
-    df["Response_Column"] = df["Time_Column"] + "_Response"
-
-    # --------------------------------------------------
-    # 7️⃣ Zaman sırasına göre sırala
+    # 6️⃣ Zaman sırasına göre sırala
     # --------------------------------------------------
     df = df.sort_values("DateTime")
 
     # --------------------------------------------------
-    # ⏰ Time → her zaman en erken
-    # --------------------------------------------------
-    grouped_time = (
-        df.groupby(
-            ["Date", "StudentID", "FullName", "Time_Column"]
-        )["Time"]
-        .first()
-        .reset_index()
-    )
-
-    # --------------------------------------------------
-    # 📨 Response → (00) S/A kuralı
+    # 7️⃣ TEK GROUPBY: (Date, StudentID, FullName, Period, Direction)
+    #   ⏰ Time → her zaman en erken (aynı gün içinde en küçük dakika)
+    #   📨 Response → (00) S/A kuralı: S/A önce, sonra zaman sırası, grubun ilki
     # --------------------------------------------------
-    grouped_response = (
-        df.groupby(
-            ["Date", "StudentID", "FullName", "Response_Column"]
-        )["Response"]
-        .apply(pick_response)
-        .reset_index()
-    )
+    df["Flags"] = response_flags(df["Response"])
+    df["_priority"] = ((df["Flags"] & FLAG_SA_ANY) == 0).astype("int8")
+    df = df.sort_values("_priority", kind="stable")
 
-    # --------------------------------------------------
-    # 8️⃣ Pivot
-    # --------------------------------------------------
-    time_pivot = grouped_time.pivot(
-        index=["Date", "StudentID", "FullName"],
-        columns="Time_Column",
-        values="Time"
+    grouped = df.groupby(
+        ["Date", "StudentID", "FullName", "Period", "Trans_Clean"], observed=True
     )
 
-    response_pivot = grouped_response.pivot(
-        index=["Date", "StudentID", "FullName"],
-        columns="Response_Column",
-        values="Response"
-    )
+    agg = pd.DataFrame({
+        "Time": grouped["Time"].min(),
+        "Response": grouped["Response"].first(skipna=False),
+        "Flags": grouped["Flags"].first(),
+    })
 
     # --------------------------------------------------
-    # 9️⃣ Birleştir
+    # 8️⃣ Tek reshape → sabit kolon şeması
     # --------------------------------------------------
-    final_df = pd.concat([time_pivot, response_pivot], axis=1).reset_index()
-    final_df.columns.name = None
-    required_columns = [
-        "Morning_IN", "Morning_OUT",
-        "Afternoon_IN", "Afternoon_OUT",
-        "Morning_IN_Response", "Morning_OUT_Response",
-        "Afternoon_IN_Response", "Afternoon_OUT_Response",
+    wide = agg.unstack(["Period", "Trans_Clean"])
+    wide.columns = [
+        f"{period}_{direction}" + ("" if field == "Time" else f"_{field}")
+        for field, period, direction in wide.columns
     ]
 
-    for col in required_columns:
-        if col not in final_df.columns:
-            final_df[col] = pd.NA
+    final_df = (
+        wide
+        .reindex(columns=TIME_COLUMNS + RESPONSE_COLUMNS + FLAG_COLUMNS)
+        .sort_index()
+        .reset_index()
+    )
+    final_df[TIME_COLUMNS] = final_df[TIME_COLUMNS].astype(MINUTES_DTYPE)
+    final_df[FLAG_COLUMNS] = final_df[FLAG_COLUMNS].fillna(0).astype(FLAGS_DTYPE)
+
     final_df = final_df.sort_values(by="FullName").reset_index(drop=True)
 
     return final_df
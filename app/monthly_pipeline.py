@@ -1,100 +1,244 @@
+import numpy as np
 import pandas as pd
-from difflib import get_close_matches
+from difflib import SequenceMatcher
 import unicodedata
 import re
+import hashlib
 import io
-import threading
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
 from openpyxl.styles import PatternFill
-from openpyxl import load_workbook
-from openpyxl.styles import PatternFill, Border, Side
-from openpyxl.styles.fills import Fill, PatternFill
 
 from app.read_excel_file import process_excel
-from app.read_pdf_file import process_pdf
+from app.read_pdf_file import iter_records, records_frame
+from app.report_writer import write_report
+
+RED = PatternFill(start_color="FF9999", end_color="FF9999", fill_type="solid")
+GREEN = PatternFill(start_color="CCFFCC", end_color="CCFFCC", fill_type="solid")
+YELLOW = PatternFill(start_color="FFFF99", end_color="FFFF99", fill_type="solid")
+
+def note_fill(note):
+    note_value = str(note).strip().upper()
+
+    if note_value == "NOT PAID":
+        return RED
+    elif note_value == "NON TRADITIONAL":
+        return YELLOW
+    elif note_value == "SELF PAID":
+        return None  # No color (aynen senin mantığın)
+    elif note_value in ["EXTRA DHS", "EXTRA COPAY", "EXTRA COPAY & EXTRA DHS"]:
+        return YELLOW
+    else:
+        return GREEN
 
-THICK_BORDER = Border(
-    left=Side(style="medium"),
-    right=Side(style="medium"),
-    top=Side(style="medium"),
-    bottom=Side(style="medium"),
-)
-
-# def auto_adjust_column_width(ws, padding=4):
-#     for column_cells in ws.columns:
-#         max_length = 0
-#         column_letter = column_cells[0].column_letter
+# -----------------------------
+# NAME CLEANING FUNCTIONS
+# -----------------------------
 
-#         for cell in column_cells:
-#             if cell.value:
-#                 max_length = max(max_length, len(str(cell.value)))
+def clean_name(name):
+    name = unicodedata.normalize('NFKD', name)
+    name = name.upper()
+    name = re.sub(r'[^A-Z ]', '', name)
+    name = re.sub(r'\s+', ' ', name)
+    return name.strip()
 
-#         ws.column_dimensions[column_letter].width = max_length + padding
+@lru_cache(maxsize=None)
+def name_key(name):
+    """Kanonik token tuple'ı: iki isim eşleşir ⇔ anahtarları eşit"""
+    return tuple(clean_name(name).split())
 
-from openpyxl.utils import get_column_letter
+# -----------------------------
+# FUZZY NAME CANONICALIZATION
+# -----------------------------
+NAME_CUTOFF = 0.85
+
+def bigrams(name):
+    return [name[i:i + 2] for i in range(len(name) - 1)]
+
+@lru_cache(maxsize=1 << 16)
+def name_ratio(word, other):
+    """
+    get_close_matches'in skoru (seq2=word, seq1=other), eşik altı → 0.0.
+    Process ömrü boyunca (run'lar arası) memoize edilir.
+    """
+    s = SequenceMatcher()
+    s.set_seq2(word)
+    s.set_seq1(other)
+    ratio = s.ratio()
+    return ratio if ratio >= NAME_CUTOFF else 0.0
+
+def passes(matches, total):
+    """difflib'in 2.0 * M / T oranı eşiği geçiyor mu (T = 0 → 1.0)"""
+    ratio = np.where(total == 0, 1.0, 2.0 * matches / np.maximum(total, 1))
+    return ratio >= NAME_CUTOFF
+
+def count_matrix(names, tokens):
+    """İsim başına token (karakter / bigram) sayıları: satır = isim"""
+    vocab = {}
+    for name in names:
+        for token in tokens(name):
+            vocab.setdefault(token, len(vocab))
+
+    counts = np.zeros((len(names), max(len(vocab), 1)), dtype=np.int16)
+    for i, name in enumerate(names):
+        for token in tokens(name):
+            counts[i, vocab[token]] += 1
+    return counts
+
+def canonical_names(names):
+    """
+    Sırayla gelen isimleri kanonik isme bağlar; sonuç
+    get_close_matches(name, önceki isimler, cutoff=0.85)[0] ile aynıdır
+    (en yüksek skor, eşitlikte büyük isim).
+
+    Önceki isimler SequenceMatcher'a girmeden, hepsi birden numpy ile elenir:
+      1) uzunluk oranı (real_quick_ratio),
+      2) karakter sayısı kesişimi (quick_ratio, birebir aynı sınır),
+      3) bigram kesişimi: M eşleşen karakter, toplam uzunluk T için
+         ortak bigram sayısı >= 3M - T - 1 olmak zorunda.
+    Sadece kalan adaylar için ratio hesaplanır.
+    """
+    names = list(names)
+    lengths = np.array([len(name) for name in names], dtype=np.int64)
+    chars = count_matrix(names, list)
+    grams = count_matrix(names, bigrams)
 
-def auto_adjust_column_width(ws, padding=4):
-    for col_idx in range(1, ws.max_column + 1):
+    name_map = {}
 
-        column_letter = get_column_letter(col_idx)
-        max_length = 0
+    for i, name in enumerate(names):
+        total = lengths[:i] + lengths[i]
 
-        for row in range(1, ws.max_row + 1):
-            cell = ws.cell(row=row, column=col_idx)
+        idx = np.flatnonzero(passes(np.minimum(lengths[:i], lengths[i]), total))
 
-            # merged hücreleri atla
-            if cell.coordinate in ws.merged_cells:
-                continue
+        matches = np.minimum(chars[idx], chars[i]).sum(axis=1)
+        idx = idx[passes(matches, total[idx])]
 
-            if cell.value:
-                max_length = max(max_length, len(str(cell.value)))
+        min_matches = np.floor(NAME_CUTOFF * total[idx] / 2)
+        shared = np.minimum(grams[idx], grams[i]).sum(axis=1)
+        idx = idx[shared >= 3 * min_matches - total[idx] - 1]
 
-        ws.column_dimensions[column_letter].width = max_length + padding
+        best = None
+        for j in idx:
+            other = names[j]
+            score = name_ratio(name, other)
+            if score and (best is None or (score, other) > best):
+                best = (score, other)
 
-def process_final(procare_file, dhs_file, auth_file):
+        name_map[name] = name_map[best[1]] if best else name
 
-    print("Excel ve PDF işlemleri başlatılıyor (threading)...")
+    return name_map
 
-    excel_result = {}
-    pdf_result = {}
+def name_keys(names):
+    """İsim Series'i → kanonik anahtar metni (unique isim başına bir kez)"""
+    keys = {name: " ".join(name_key(name)) for name in pd.unique(names)}
+    return names.map(keys)
 
-    def run_excel():
-        excel_result["data"] = process_excel(procare_file)
+def amount_or_zero(values):
+    """float(x or 0) kolon bazında: "" → 0"""
+    return pd.to_numeric(values.where(values != "", 0))
 
-    def run_pdf():
-        pdf_result["data"] = process_pdf(dhs_file)
+# -----------------------------
+# AUTHORIZATION INDEX
+# -----------------------------
+# Dosya içeriğinin SHA-256'sı → {kanonik isim: "CASE #/PERSON"}; liste nadiren
+# değiştiği için aynı dosya sonraki run'larda tekrar okunmaz.
+AUTH_INDEX_CACHE = {}
+AUTH_INDEX_ENTRIES = 8
+
+def file_bytes(file):
+    """Dosya yolu veya dosya benzeri nesne (BytesIO / UploadedFile) → bytes"""
+    if hasattr(file, "getvalue"):
+        return file.getvalue()
+    if hasattr(file, "read"):
+        return file.read()
+    with open(file, "rb") as f:
+        return f.read()
+
+def build_auth_index(auth_list):
+    """Her kanonik isim için listedeki İLK satırın "CASE #/PERSON" değeri"""
+    auth_list.columns = auth_list.columns.str.strip().str.upper()
 
-    excel_thread = threading.Thread(target=run_excel)
-    pdf_thread = threading.Thread(target=run_pdf)
+    index = {}
+    for name, case, person in zip(
+        auth_list["CHILD NAME"], auth_list["CASE #"], auth_list["PERSON"]
+    ):
+        index.setdefault(
+            " ".join(name_key(str(name))), f"{str(case).strip()}/{str(person).strip()}"
+        )
+    return index
 
-    excel_thread.start()
-    pdf_thread.start()
+def read_auth_index(data):
+    return build_auth_index(pd.read_excel(io.BytesIO(data), dtype=str))
 
-    excel_thread.join()
-    pdf_thread.join()
+# -----------------------------
+# INGEST (Procare xlsx + DHS pdf + authorization listesi)
+# -----------------------------
+# Üç dosya ayrı process'lerde parse edilir (GIL yok); toplam boyut küçükse
+# process açma maliyetine değmez, aynı process'te sırayla çalışır.
+INGEST_PROCESS_MIN_BYTES = 512 * 1024
+
+def read_procare(data):
+    return process_excel(io.BytesIO(data))
+
+def read_dhs(data, workers=None):
+    # Kayıtlar sayfa sayfa akar, DataFrame parça parça kurulur
+    df = records_frame(iter_records(data, workers=workers))
+    print("✔ PDF işlendi. Toplam satır:", len(df))
+    return df
+
+def ingest(procare_file, dhs_file, auth_file):
+    """
+    return: (Procare tablosu, Procare banner satırları, DHS tablosu,
+             authorization indeksi)
+    Authorization indeksi içerik hash'i ile cache'te varsa tekrar parse edilmez.
+    """
+    auth_data = file_bytes(auth_file)
+    auth_digest = hashlib.sha256(auth_data).hexdigest()
+
+    tasks = {
+        "procare": (read_procare, file_bytes(procare_file)),
+        "dhs": (read_dhs, file_bytes(dhs_file)),
+    }
+    if auth_digest not in AUTH_INDEX_CACHE:
+        tasks["auth"] = (read_auth_index, auth_data)
+
+    total = sum(len(data) for _, data in tasks.values())
+    workers = min(len(tasks), os.cpu_count() or 1)
+
+    if total < INGEST_PROCESS_MIN_BYTES or workers < 2:
+        print("Excel ve PDF işlemleri başlatılıyor (tek process)...")
+        results = {name: func(data) for name, (func, data) in tasks.items()}
+    else:
+        print(f"Excel ve PDF işlemleri başlatılıyor ({workers} process)...")
+        # DHS worker'ı kendi sayfa pool'unu açar; diğer dosyaların
+        # process'lerinden arta kalan çekirdeklerle sınırlanır
+        pdf_workers = max(1, (os.cpu_count() or 1) - (len(tasks) - 1))
+
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {
+                name: pool.submit(func, data)
+                for name, (func, data) in tasks.items() if name != "dhs"
+            }
+            futures["dhs"] = pool.submit(read_dhs, tasks["dhs"][1], pdf_workers)
+            results = {name: future.result() for name, future in futures.items()}
 
     print("✔ Excel ve PDF işlemleri tamamlandı.\n")
 
-    first, header_rows = excel_result["data"]
-    second = pdf_result["data"]
+    if "auth" in results:
+        if len(AUTH_INDEX_CACHE) >= AUTH_INDEX_ENTRIES:
+            AUTH_INDEX_CACHE.pop(next(iter(AUTH_INDEX_CACHE)))
+        AUTH_INDEX_CACHE[auth_digest] = results["auth"]
 
-#   🔧 Clean column names
-    second.columns = second.columns.str.strip().str.upper()
+    first, header_rows = results["procare"]
+    return first, header_rows, results["dhs"], AUTH_INDEX_CACHE[auth_digest]
 
-    # -----------------------------
-    # NAME CLEANING FUNCTIONS
-    # -----------------------------
+def process_final(procare_file, dhs_file, auth_file):
 
-    def clean_name(name):
-        name = unicodedata.normalize('NFKD', name)
-        name = name.upper()
-        name = re.sub(r'[^A-Z ]', '', name)
-        name = re.sub(r'\s+', ' ', name)
-        return name.strip()
+    first, header_rows, second, auth_cases = ingest(procare_file, dhs_file, auth_file)
 
-    def name_matches(second_fullname, first_fullname):
-        s = clean_name(second_fullname).split()
-        f = clean_name(first_fullname).split()
-        return s == f
+#   🔧 Clean column names
+    second.columns = second.columns.str.strip().str.upper()
 
     # -----------------------------
     # DATE FORMAT NORMALIZATION
@@ -110,132 +254,104 @@ def process_final(procare_file, dhs_file, auth_file):
     # -----------------------------
     # MATCHING LOGIC
     # -----------------------------
-
-    final_rows = []
-
-    for _, row in second.iterrows():
-        full_name = str(row["FULL NAME"]).strip().upper()
-        swipe_date = str(row["SWIPE DATE"]).strip()
-
-        possible_matches = [
-            name for name in first["Full Name"].tolist()
-            if name_matches(full_name, name)
-        ]
-
-        copay_val = float(row.get("COPAY AP", 0) or 0)
-        amount_val = float(row.get("AMOUNT PAID", 0) or 0)
-
-        if possible_matches:
-            matched_rows = first[first["Full Name"].isin(possible_matches)]
-
-            if swipe_date in matched_rows["Attdate"].values:
-                row["NOTE"] = "DHS PAID"
-                final_rows.append(row)
-            else:
-                if amount_val == 14.00:
-                    row["NOTE"] = "NON TRADITIONAL"
-                    row["COPAY EXTRA"] = copay_val
-                    row["AMOUNT EXTRA"] = amount_val
-                    final_rows.append(row)
-                    continue
-
-                if copay_val == 0 and amount_val == 0:
-                    continue
-
-                if copay_val > 0 and amount_val > 0:
-                    row["NOTE"] = "EXTRA COPAY & EXTRA DHS"
-                elif amount_val > 0:
-                    row["NOTE"] = "EXTRA DHS"
-                elif copay_val > 0:
-                    row["NOTE"] = "EXTRA COPAY"
-                else:
-                    row["NOTE"] = "EXTRA"
-
-                row["COPAY EXTRA"] = copay_val
-                row["AMOUNT EXTRA"] = amount_val
-                final_rows.append(row)
-        else:
-            if copay_val == 0 and amount_val == 0:
-                continue
-
-            if copay_val > 0 and amount_val > 0:
-                row["NOTE"] = "EXTRA COPAY & EXTRA DHS"
-            elif amount_val > 0:
-                row["NOTE"] = "EXTRA DHS"
-            elif copay_val > 0:
-                row["NOTE"] = "EXTRA COPAY"
-            else:
-                row["NOTE"] = "EXTRA"
-
-            row["COPAY EXTRA"] = copay_val
-            row["AMOUNT EXTRA"] = amount_val
-            final_rows.append(row)
-
-    second = pd.DataFrame(final_rows)
+    # İsimler kanonik anahtara (name_keys), tarihler metne çevrilir;
+    # eşleşmeler (anahtar, tarih) üzerinde merge + indicator ile bulunur.
+
+    attended = pd.DataFrame({
+        "_key": name_keys(first["Full Name"]),
+        "_date": first["Attdate"],
+    }).drop_duplicates()
+
+    swipes = pd.DataFrame({
+        "_key": name_keys(second["FULL NAME"].map(str).str.strip().str.upper()),
+        "_date": second["SWIPE DATE"].map(str).str.strip(),
+    })
+    known = swipes["_key"].isin(attended["_key"]).to_numpy()
+    paid = (
+        swipes.merge(attended, on=["_key", "_date"], how="left", indicator=True)["_merge"]
+        == "both"
+    ).to_numpy()
+
+    copay = second["COPAY AP"].astype(float).to_numpy()
+    amount = second["AMOUNT PAID"].astype(float).to_numpy()
+
+    # Sıra önemli: ilk eşleşen kural; "" → satır rapora girmez
+    note = np.select(
+        [
+            known & paid,
+            known & (amount == 14.00),
+            (copay == 0) & (amount == 0),
+            (copay > 0) & (amount > 0),
+            amount > 0,
+            copay > 0,
+        ],
+        [
+            "DHS PAID",
+            "NON TRADITIONAL",
+            "",
+            "EXTRA COPAY & EXTRA DHS",
+            "EXTRA DHS",
+            "EXTRA COPAY",
+        ],
+        default="EXTRA"
+    )
+
+    second["NOTE"] = note
+    second["COPAY EXTRA"] = np.where(note == "DHS PAID", np.nan, copay)
+    second["AMOUNT EXTRA"] = np.where(note == "DHS PAID", np.nan, amount)
+
+    second = second[note != ""]
 
 # -----------------------------
 # ADDITIONAL LOOP: SELF PAID / NOT PAID
 # -----------------------------
-    extra_rows = []
-
-    for _, row in first.iterrows():
-        full_first = str(row["Full Name"]).strip().upper()
-        date_first = str(row["Attdate"]).strip()
-
-        possible_matches = [
-            name for name in second["FULL NAME"].tolist()
-            if name_matches(full_first, name)
-        ]
-
-        if not possible_matches:
-            # CASE 1: SELF PAID
-            extra_rows.append({
-                "FULL NAME": full_first,
-                "CASE/PERSON": "NO CASE#",
-                "SWIPE DATE": date_first,
-                "COPAY AP": "",
-                "AMOUNT PAID": "",
-                "NOTE": "SELF PAID",
-                "COPAY EXTRA": "",
-                "AMOUNT EXTRA": ""
-            })
-            continue
-
-        matched_rows = second[second["FULL NAME"].isin(possible_matches)]
-
-        # CASE 2: exists by name but NOT on that date → NOT PAID
-        if date_first not in matched_rows["SWIPE DATE"].astype(str).values:
-            case_person = matched_rows.iloc[0].get("CASE/PERSON", "NO CASE#")
-            if pd.isna(case_person) or case_person == "":
-                case_person = "NO CASE#"
-
-            extra_rows.append({
-                "FULL NAME": full_first,
-                "CASE/PERSON": case_person,
-                "SWIPE DATE": date_first,
-                "COPAY AP": 0.0,
-                "AMOUNT PAID": 0.0,
-                "NOTE": "NOT PAID",
-                "COPAY EXTRA": "",
-                "AMOUNT EXTRA": ""
-            })
-
-    if extra_rows:
-        extra_df = pd.DataFrame(extra_rows)
+    # Procare günleri: isim DHS'te hiç yoksa SELF PAID,
+    # isim var ama o gün yoksa NOT PAID (CASE/PERSON: ismin ilk DHS satırı)
+    second_keys = name_keys(second["FULL NAME"])
+
+    cases = pd.DataFrame({
+        "_key": second_keys,
+        "_case": second["CASE/PERSON"],
+    }).drop_duplicates("_key")
+
+    swiped = pd.DataFrame({
+        "_key": second_keys,
+        "_date": second["SWIPE DATE"].astype(str),
+    }).drop_duplicates()
+
+    full_first = first["Full Name"].map(str).str.strip().str.upper()
+    date_first = first["Attdate"].map(str).str.strip()
+
+    days = pd.DataFrame({"_key": name_keys(full_first), "_date": date_first})
+    days = days.merge(cases, on="_key", how="left", indicator="_name")
+    days = days.merge(swiped, on=["_key", "_date"], how="left", indicator="_day")
+
+    self_paid = (days["_name"] == "left_only").to_numpy()
+    not_paid = ~self_paid & (days["_day"] == "left_only").to_numpy()
+
+    case_person = days["_case"].astype(object)
+    case_person = case_person.where(case_person.notna() & (case_person != ""), "NO CASE#")
+
+    blank = pd.Series("", index=days.index, dtype=object)
+
+    extra_df = pd.DataFrame({
+        "FULL NAME": full_first.to_numpy(),
+        "CASE/PERSON": case_person.where(~self_paid, "NO CASE#"),
+        "SWIPE DATE": date_first.to_numpy(),
+        "COPAY AP": blank.where(self_paid, 0.0),
+        "AMOUNT PAID": blank.where(self_paid, 0.0),
+        "NOTE": np.where(self_paid, "SELF PAID", "NOT PAID"),
+        "COPAY EXTRA": blank,
+        "AMOUNT EXTRA": blank,
+    })[self_paid | not_paid]
+
+    if len(extra_df):
         second = pd.concat([second, extra_df], ignore_index=True)
 
     # -----------------------------
     # NAME NORMALIZATION
     # -----------------------------
-    unique_names = second["FULL NAME"].unique()
-    name_map = {}
-
-    for name in unique_names:
-        match = get_close_matches(name, list(name_map.keys()), cutoff=0.85)
-        if match:
-            name_map[name] = name_map[match[0]]
-        else:
-            name_map[name] = name
+    name_map = canonical_names(second["FULL NAME"].unique())
 
     second["FULL NAME"] = second["FULL NAME"].map(name_map)
     second["FULL NAME"] = second["FULL NAME"].str.strip()
@@ -244,136 +360,71 @@ def process_final(procare_file, dhs_file, auth_file):
     # -----------------------------
     # SORTING + DUPLICATE CONTROL
     # -----------------------------
-    second["SWIPE DATE"] = pd.to_datetime(second["SWIPE DATE"], errors="coerce")
-    second = second.sort_values(by=["FULL NAME", "SWIPE DATE"], ascending=[True, True])
-    second["SWIPE DATE"] = second["SWIPE DATE"].dt.strftime("%m/%d/%Y")
+    # Tarih metinleri zaten MM/DD/YYYY; sıralama için tek parse (_day),
+    # parse edilemeyenler eskisi gibi boş kalır.
+    second["_day"] = pd.to_datetime(second["SWIPE DATE"], format="%m/%d/%Y", errors="coerce")
+    second["SWIPE DATE"] = second["SWIPE DATE"].where(second["_day"].notna())
 
-    duplicates = second.duplicated(subset=["FULL NAME", "SWIPE DATE"], keep=False)
+    second = second.sort_values(by=["FULL NAME", "_day"], ascending=[True, True])
 
-    for (name, date), group in second[duplicates].groupby(["FULL NAME", "SWIPE DATE"]):
-        zero_rows = group[(group["AMOUNT PAID"] == 0) & (group["COPAY AP"] == 0)]
-        if not zero_rows.empty:
-            second = second.drop(zero_rows.index)
+    # Aynı (isim, gün) birden fazla satırsa, tutarı ve copay'i 0 olanlar atılır
+    group_size = (
+        second.groupby(["FULL NAME", "_day"])["NOTE"].transform("size").fillna(0)
+    )
+    zero = (second["AMOUNT PAID"] == 0) & (second["COPAY AP"] == 0)
+
+    second = second[~((group_size > 1) & zero)].drop(columns="_day")
 
     # -----------------------------
     # DHS PAID -> NOT PAID düzeltme
     # -----------------------------
-    for idx, row in second.iterrows():
-        if str(row.get("NOTE", "")).upper() == "DHS PAID" and \
-        float(row.get("AMOUNT PAID", 0) or 0) == 0 and \
-        float(row.get("COPAY AP", 0) or 0) == 0:
-            second.at[idx, "NOTE"] = "NOT PAID"
+    unpaid = (
+        (second["NOTE"].str.upper() == "DHS PAID")
+        & (amount_or_zero(second["AMOUNT PAID"]) == 0)
+        & (amount_or_zero(second["COPAY AP"]) == 0)
+    )
+    second.loc[unpaid, "NOTE"] = "NOT PAID"
 
 
     # -----------------------------
     # AUTHORIZATION CHECK
     # -----------------------------
 
-    auth_list = pd.read_excel(auth_file, dtype=str)
-    auth_list.columns = auth_list.columns.str.strip().str.upper()
-
-    for idx, row in second.iterrows():
-        if str(row.get("NOTE", "")).upper() == "SELF PAID":
-            student_name = str(row["FULL NAME"]).strip().upper()
-
-            auth_match = auth_list[
-                auth_list["CHILD NAME"].apply(lambda x: name_matches(student_name, str(x)))
-            ]
-
-            if not auth_match.empty:
-                second.at[idx, "NOTE"] = "NOT PAID"
-                second.at[idx, "COPAY AP"] = 0
-                second.at[idx, "AMOUNT PAID"] = 0
-
-                case_number = str(auth_match.iloc[0]["CASE #"]).strip()
-                person_number = str(auth_match.iloc[0]["PERSON"]).strip()
+    self_paid = second["NOTE"].astype(str).str.upper() == "SELF PAID"
+    student_keys = name_keys(
+        second.loc[self_paid, "FULL NAME"].map(str).str.strip().str.upper()
+    )
+    case_person = student_keys.map(auth_cases)
+    authorized = case_person.index[case_person.notna()]
 
-                second.at[idx, "CASE/PERSON"] = f"{case_number}/{person_number}"
+    second.loc[authorized, "NOTE"] = "NOT PAID"
+    second.loc[authorized, "COPAY AP"] = 0
+    second.loc[authorized, "AMOUNT PAID"] = 0
+    second.loc[authorized, "CASE/PERSON"] = case_person[authorized]
 
-    for i, row in second.iterrows():
-        if row["AMOUNT PAID"] == 14:
-            second.at[i, "NOTE"] = "NON TRADITIONAL"
-            second.at[i, "COPAY EXTRA"] = 0
-            second.at[i, "AMOUNT EXTRA"] = 14
+    non_traditional = second["AMOUNT PAID"] == 14
+    second.loc[non_traditional, "NOTE"] = "NON TRADITIONAL"
+    second.loc[non_traditional, "COPAY EXTRA"] = 0
+    second.loc[non_traditional, "AMOUNT EXTRA"] = 14
 
 
     # -----------------------------
     # MEMORY EXCEL EXPORT
     # -----------------------------
+    # Procare header satırları en üstte (sadece ilk kolon), A-H merge,
+    # NOTE renkleri, kalın kenarlık ve kolon genişlikleri tek geçişte yazılır.
 
-    output = io.BytesIO()
-    second.to_excel(output, index=False, engine="openpyxl")
-    output.seek(0)
-
-    # --------------------------------------------------
-    # PROCARE HEADER SATIRLARINI EN ÜSTE EKLE
-    # --------------------------------------------------
-
-    # Excel'e yazılmış dosyayı aç
-    wb = load_workbook(output)
-    ws = wb.active
-
-    # En üste 3 satır boşluk aç
-    ws.insert_rows(1, amount=3)
-
-    # Header satırlarını yaz
-    for i, row in enumerate(header_rows.values, start=1):
-        first_cell_value = row[0]  # sadece ilk kolon
-        ws.cell(row=i, column=1, value=first_cell_value)
-
-    from openpyxl.styles import Alignment
-
-    # ===== MERGE + CENTER FIRST 3 ROWS (A-H) =====
-    for row_idx in range(1, 4):  # sadece ilk 3 satır
-        ws.merge_cells(start_row=row_idx, start_column=1, end_row=row_idx, end_column=8)
-        ws.cell(row=row_idx, column=1).alignment = Alignment(horizontal="center", vertical="center")
-
-    note_col = None
-    for idx, cell in enumerate(ws[4], start=1):
-        if cell.value == "NOTE":
-            note_col = idx
-            break
-
-    red = PatternFill(start_color="FF9999", end_color="FF9999", fill_type="solid")
-    green = PatternFill(start_color="CCFFCC", end_color="CCFFCC", fill_type="solid")
-    yellow = PatternFill(start_color="FFFF99", end_color="FFFF99", fill_type="solid")
-
-    for row in ws.iter_rows(min_row=5):
-        note_cell = row[note_col - 1]
-        note_value = str(note_cell.value).strip().upper()
-
-        if note_value == "NOT PAID":
-            note_cell.fill = red
-        elif note_value == "NON TRADITIONAL":
-            note_cell.fill = yellow
-        elif note_value == "SELF PAID":
-            continue  # No color (aynen senin mantığın)
-        elif note_value in ["EXTRA DHS", "EXTRA COPAY", "EXTRA COPAY & EXTRA DHS"]:
-            note_cell.fill = yellow
-        else:
-            note_cell.fill = green
-
-    # ===== APPLY THICK BORDERS =====
-    for row in ws.iter_rows(
-        min_row=4,
-        max_row=ws.max_row,
-        min_col=1,
-        max_col=ws.max_column
-    ):
-        for cell in row:
-            cell.border = THICK_BORDER
-
-    # ===== AUTO COLUMN WIDTH =====
-    auto_adjust_column_width(ws, padding=4)
+    final_output = io.BytesIO()
 
-    # Fix for Python 3.14 + openpyxl compatibility
-    wb._fills = [
-        f if isinstance(f, Fill) else PatternFill()
-        for f in wb._fills
-    ]
+    write_report(
+        final_output,
+        second,
+        banner_rows=[[row[0]] for row in header_rows.values],
+        merge_width=8,
+        fills={"NOTE": [note_fill(note) for note in second["NOTE"]]},
+        padding=4
+    )
 
-    final_output = io.BytesIO()
-    wb.save(final_output)
     final_output.seek(0)
 
     print("🎨 Renkler uygulandı.")
@@ -0,0 +1,166 @@
+import argparse
+import random
+import re
+import time
+
+from app.read_pdf_file import page_records, parse_amount, tokenize
+
+# --------------------------------------------------
+# DHS ödeme dökümü satır işleme micro-benchmark'ı
+# Sentetik çok sayfalı döküm metni üzerinde eski satır döngüsü ile
+# page_records (tek geçiş, durum makinesi) karşılaştırılır.
+# Sadece metin işleme ölçülür (PDF'ten metin çıkarma hariç).
+#
+#   python -m app.pdf_benchmark --pages 500
+# --------------------------------------------------
+
+
+# DHS günlük ödeme tutarları yaş grubu / gün tipi tarifesinden gelir,
+# copay'ler de sabit basamaklardan; dökümdeki tutarlar bu yüzden tekrar eder
+DAILY_RATES = ["28.15", "31.40", "36.90", "41.25", "45.60", "52.35", "58.10", "21,75"]
+COPAYS = ["0", "0.00", "1.00", "2.50", "4.00", "5,50", "7.00"]
+
+
+def synthetic_pages(n_pages, lines_per_page=45, seed=0):
+    """Gerçek dökümün satır düzeninde sayfa metinleri (list of str)"""
+    rnd = random.Random(seed)
+    lines = ["DHS PAYMENT STATEMENT", "PROVIDER: HONEYBEE"]
+
+    child = 0
+    while len(lines) < n_pages * lines_per_page:
+        child += 1
+        first, last = f"CHILD{child}", f"FAMILY{child % 97}"
+        case = f"{1000 + child}/{child % 3 + 1}"
+
+        if rnd.random() < .5:
+            lines.append(f"CASE/PERSON: {case} NAME: {first} {last}")
+        else:
+            lines.append(f"CASE/PERSON: {case}   NAME: {first}")
+            lines.append(last)
+        lines.append("SWIPE DATE COPAY AMOUNT")
+
+        for day in range(1, 23):
+            lines.append(f"10/{day:02d}/2025")
+            kind = rnd.random()
+            if kind < .1:
+                nums = ["0", "14.00"]
+            elif kind < .2:
+                nums = ["5,50"]
+            elif kind < .25:
+                nums = []
+            else:
+                nums = [rnd.choice(COPAYS), rnd.choice(DAILY_RATES)]
+
+            if nums and rnd.random() < .3:
+                lines.append(" ".join(nums))
+            else:
+                lines.extend(nums)
+            if rnd.random() < .05:
+                lines.append(f"TOTAL FOR CHILD {first}")
+            if rnd.random() < .05:
+                lines.append("")
+
+    return [
+        "\n".join(lines[i:i + lines_per_page])
+        for i in range(0, len(lines), lines_per_page)
+    ]
+
+
+def legacy_page_records(text, name, case):
+    """Eski process_pdf satır döngüsü (referans; çıktı page_records ile aynı olmalı)"""
+    date_pattern = re.compile(r"^\d{2}/\d{2}/\d{4}")
+    number_pattern = re.compile(r"^\d+(?:[.,]\d{1,2})?$")
+
+    def extract_name(lines, start_idx):
+        name_line = lines[start_idx].replace("NAME:", "").strip()
+        idx = start_idx + 1
+        while idx < len(lines):
+            next_line = lines[idx].strip()
+            if next_line == "" or re.match(r"^\d", next_line) or next_line.split()[0].upper() == "SWIPE":
+                break
+            name_line += " " + next_line
+            idx += 1
+        return name_line.strip(), idx
+
+    def emit(group):
+        numbers = [x for x in group[1:] if number_pattern.match(x)]
+        numbers_to_print = numbers[:2]
+        copay = parse_amount(numbers_to_print[0]) if len(numbers_to_print) > 0 else 0.0
+        amount = parse_amount(numbers_to_print[1]) if len(numbers_to_print) > 1 else 0.0
+        return [name, case, group[0], copay, amount]
+
+    data = []
+    current_group = []
+    lines = text.splitlines()
+    i = 0
+    while i < len(lines):
+        line = lines[i].strip()
+
+        if "CASE/PERSON:" in line:
+            case = line.split("CASE/PERSON:")[1].strip().split()[0]
+            if "NAME:" in line:
+                lines[i] = line[line.find("NAME:") + len("NAME:"):].strip()
+                name, j = extract_name(lines, i)
+                i = j - 1
+
+        elif date_pattern.match(line):
+            if current_group:
+                data.append(emit(current_group))
+                current_group = []
+            current_group.append(line)
+
+        elif current_group:
+            if all(number_pattern.match(x) for x in line.split()):
+                current_group.extend(line.split())
+            else:
+                data.append(emit(current_group))
+                current_group = []
+
+        i += 1
+
+    if current_group:
+        data.append(emit(current_group))
+
+    return data, name, case
+
+
+def run(parse, pages):
+    name, case = None, None
+    data = []
+    for text in pages:
+        records, name, case = parse(text, name, case)
+        data.extend(records)
+    return data
+
+
+def best_time(parse, pages, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        tokenize.cache_clear()  # her tekrar soğuk cache ile
+        start = time.perf_counter()
+        run(parse, pages)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="DHS statement line parsing benchmark")
+    parser.add_argument("--pages", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    pages = synthetic_pages(args.pages)
+
+    if run(legacy_page_records, pages) != run(page_records, pages):
+        raise AssertionError("page_records çıktısı eski döngüden farklı")
+
+    legacy = best_time(legacy_page_records, pages, args.repeat)
+    current = best_time(page_records, pages, args.repeat)
+
+    print(f"{len(pages)} sayfa, {len(run(page_records, pages))} kayıt")
+    print(f"eski döngü:   {legacy * 1000:.1f} ms")
+    print(f"page_records: {current * 1000:.1f} ms ({legacy / current:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,23 @@
+import numpy as np
 import pandas as pd
 import re
 
+from app.time_utils import clock_minutes
+
 # --------------------------------------------------
-# Saat formatını ayıkla (08:05 AM gibi)
+# Saat formatı (08:05 AM gibi)
 # --------------------------------------------------
-def extract_time(val):
-    if pd.isna(val):
-        return None
-    match = re.search(r"(\d{1,2}:\d{2}\s*(AM|PM))", str(val))
-    return match.group(1) if match else None
+TIME_PATTERN = r"(\d{1,2}:\d{2}\s*(?:AM|PM))"
+
+# Slot kolonu: 4 sabit değer → category (concat ve pivot kodlar üzerinden)
+SLOT_DTYPE = pd.CategoricalDtype(
+    ["Afternoon_IN", "Afternoon_OUT", "Morning_IN", "Morning_OUT"]
+)
+
+
+def extract_times(values):
+    """Tüm hücrelerden saati tek str.extract ile ayıklar, eşleşmeyen → NaN"""
+    return values.astype(str).str.extract(TIME_PATTERN, expand=False)
 
 
 def process_procare(df_raw: pd.DataFrame, header_text: str) -> pd.DataFrame:
@@ -58,102 +67,70 @@ def process_procare(df_raw: pd.DataFrame, header_text: str) -> pd.DataFrame:
     df.columns = new_cols
 
     # --------------------------------------------------
-    # 4️⃣ LONG FORMAT (RAW IN / OUT)
+    # 4️⃣ LONG FORMAT (RAW IN / OUT) — kolonsal, hücre başına döngü yok
     # --------------------------------------------------
     in_cols = [c for c in df.columns if c.endswith("IN")]
-    records = []
-
-    for _, row in df.iterrows():
-        first = row.get("First Name")
-        last = row.get("Last Name")
-        student_id = row.get("External Student ID")
-
-        for in_col in in_cols:
-            base = in_col.replace(" IN", "")
-            day = base.split()[1].zfill(2)
-            out_col = f"{base} OUT"
+    bases = [c.replace(" IN", "") for c in in_cols]
+    attdates = [f"{year}-{month_num:02d}-{base.split()[1].zfill(2)}" for base in bases]
 
-            in_time = extract_time(row[in_col])
-            out_time = extract_time(row[out_col]) if out_col in df.columns else None
+    ids = df.reindex(columns=["External Student ID", "First Name", "Last Name"])
+    ids.columns = ["StudentID", "First", "Last"]
 
-            if pd.isna(in_time):
-                continue
-
-            attdate = f"{year}-{month_num:02d}-{day}"
+    # Full Name öğrenci başına bir kez; gün satırlarına category olarak çoğalır
+    ids["Full Name"] = (
+        ids["First"].fillna("") + " " + ids["Last"].fillna("")
+    ).str.strip().str.upper()
+    ids = ids[["StudentID", "Full Name"]].astype("category")
+
+    out_times = pd.DataFrame(
+        {
+            in_col: df[f"{base} OUT"] if f"{base} OUT" in df.columns else np.nan
+            for in_col, base in zip(in_cols, bases)
+        },
+        index=df.index
+    )
 
-            records.append({
-                "StudentID": student_id,
-                "First": first,
-                "Last": last,
-                "Attdate": attdate,
-                "IN": in_time,
-                "OUT": out_time
-            })
+    final_df = ids.loc[ids.index.repeat(len(in_cols))].reset_index(drop=True)
+    final_df["Attdate"] = np.tile(attdates, len(df))
+    final_df["IN"] = extract_times(pd.Series(df[in_cols].to_numpy().ravel()))
+    final_df["OUT"] = extract_times(pd.Series(out_times.to_numpy().ravel()))
 
-    final_df = pd.DataFrame(records)
+    final_df = final_df[final_df["IN"].notna()].reset_index(drop=True)
 
     # --------------------------------------------------
-    # 5️⃣ FULL NAME + DATETIME
+    # 5️⃣ DATE + DAKİKA (gece yarısından beri)
     # --------------------------------------------------
-    final_df["Full Name"] = (
-        final_df["First"].fillna("") + " " + final_df["Last"].fillna("")
-    ).str.strip().str.upper()
-
     final_df["Attdate"] = pd.to_datetime(final_df["Attdate"], errors="coerce")
+    has_date = final_df["Attdate"].notna()
 
-    final_df["IN_dt"] = pd.to_datetime(
-        final_df["Attdate"].dt.strftime("%Y-%m-%d") + " " + final_df["IN"],
-        errors="coerce"
-    )
-
-    final_df["OUT_dt"] = pd.to_datetime(
-        final_df["Attdate"].dt.strftime("%Y-%m-%d") + " " + final_df["OUT"],
-        errors="coerce"
-    )
+    final_df["IN_min"] = clock_minutes(final_df["IN"]).where(has_date)
+    final_df["OUT_min"] = clock_minutes(final_df["OUT"]).where(has_date)
 
     # --------------------------------------------------
-    # 6️⃣ MORNING / AFTERNOON AYRIMI
+    # 6️⃣ + 7️⃣ MORNING / AFTERNOON AYRIMI → LONG FORMAT (DHS STYLE)
     # --------------------------------------------------
-    final_df["IN_Period"] = final_df["IN_dt"].dt.hour.apply(
-        lambda x: "Morning" if x < 12 else "Afternoon"
-    )
-
-    final_df["OUT_Period"] = final_df["OUT_dt"].dt.hour.apply(
-        lambda x: "Morning" if x < 12 else "Afternoon"
-    )
+    parts = []
 
-    # --------------------------------------------------
-    # 7️⃣ LONG FORMAT (DHS STYLE)
-    # --------------------------------------------------
-    rows = []
+    for direction in ("IN", "OUT"):
+        times = final_df[f"{direction}_min"]
+        part = final_df.loc[times.notna(), ["Full Name", "StudentID", "Attdate"]]
 
-    for _, r in final_df.iterrows():
-        if pd.notna(r["IN_dt"]):
-            rows.append({
-                "Full Name": r["Full Name"],
-                "StudentID": r["StudentID"],
-                "Attdate": r["Attdate"],
-                "Column": f"{r['IN_Period']}_IN",
-                "Time": r["IN_dt"]
-            })
+        period = np.where(times[times.notna()] < 12 * 60, "Morning", "Afternoon")
+        part["Column"] = pd.Categorical(
+            np.char.add(period, f"_{direction}"), dtype=SLOT_DTYPE
+        )
+        part["Time"] = times[times.notna()]
 
-        if pd.notna(r["OUT_dt"]):
-            rows.append({
-                "Full Name": r["Full Name"],
-                "StudentID": r["StudentID"],
-                "Attdate": r["Attdate"],
-                "Column": f"{r['OUT_Period']}_OUT",
-                "Time": r["OUT_dt"]
-            })
+        parts.append(part)
 
-    long_df = pd.DataFrame(rows)
+    long_df = pd.concat(parts, ignore_index=True)
 
     # --------------------------------------------------
     # 8️⃣ AYNI SLOT İÇİN EN ERKEN ZAMAN
     # --------------------------------------------------
     agg = (
         long_df
-        .groupby(["Full Name", "StudentID", "Attdate", "Column"])["Time"]
+        .groupby(["Full Name", "StudentID", "Attdate", "Column"], observed=True)["Time"]
         .min()
         .reset_index()
     )
@@ -165,16 +142,14 @@ def process_procare(df_raw: pd.DataFrame, header_text: str) -> pd.DataFrame:
         index=["Full Name", "StudentID", "Attdate"],
         columns="Column",
         values="Time"
-    ).reset_index()
+    )
+    pivot_df.columns = pivot_df.columns.astype(object)
+    pivot_df = pivot_df.reset_index()
 
     # --------------------------------------------------
-    # 🔟 FORMATLAR
+    # 🔟 FORMATLAR (saatler dakika olarak kalır)
     # --------------------------------------------------
-    for c in pivot_df.columns:
-        if c.endswith("_IN") or c.endswith("_OUT"):
-            pivot_df[c] = pivot_df[c].dt.strftime("%H:%M")
-
-    pivot_df["Attdate"] = pivot_df["Attdate"].dt.strftime("%m/%d/%Y")
+    pivot_df["Attdate"] = pivot_df["Attdate"].dt.strftime("%m/%d/%Y").astype("category")
 
     pivot_df = pivot_df.sort_values(by=["Full Name", "Attdate"])
 
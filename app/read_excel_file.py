@@ -1,9 +1,44 @@
 import pandas as pd
 import re
+from pandas.io.parsers import TextParser
+
+PROCARE_HEADER_ROW = 8
+PROCARE_CATEGORY_COLUMNS = ["Last", "First", "StudentID", "Attdate", "Full Name"]
+
+
+def load_procare_workbook(file):
+    """
+    Procare xlsx dosyasını TEK SEFERDE okur (daily ve monthly ortak).
+    return: header_text (A1), header_rows (ilk 3 satır), df (header=8 gövde)
+
+    Hücreler bir kez parse edilir; header_rows ve df, pd.read_excel'in
+    kullandığı TextParser ile aynı satırlardan kurulur, yani
+    read_excel(nrows=3) ve read_excel(header=8) ile birebir aynıdır.
+    """
+    raw = pd.read_excel(file, header=None, dtype=object).fillna("")
+    rows = raw.values.tolist()
+
+    header_text = rows[0][0]
+
+    # nrows=3 okuması gibi: satır sonundaki boş hücreler kolon üretmesin
+    top = []
+    for row in rows[:3]:
+        while row and row[-1] == "":
+            row = row[:-1]
+        top.append(row)
+    width = max(len(row) for row in top)
+    top = [row + [""] * (width - len(row)) for row in top]
+    header_rows = TextParser(top, header=None).read()
+
+    df = TextParser(rows, header=PROCARE_HEADER_ROW).read()
+
+    return header_text, header_rows, df
+
 
 def process_excel(file):
+    header_text, header_rows, df = load_procare_workbook(file)
+
     # ------------------ 1) AY & YILI ÜST SATIRDAN OTOMATİK AL ------------------
-    header_text = pd.read_excel(file, header=None).iloc[0, 0]
 
     match = re.search(r"(\d{2})\s+([A-Za-z]+),\s+(\d{4})", header_text)
 
@@ -21,13 +56,7 @@ def process_excel(file):
 
     month_num = months[month_str]
 
-    df_raw = pd.read_excel(file, header=None)
-    
-    # 2️⃣ İlk 3 satırı al
-    header_rows = df_raw.head(3)
-    # ------------------ 2) ANA TABLOYU OKU ------------------
-    df = pd.read_excel(file, header=8)
-
+    # ------------------ 2) ANA TABLO ------------------
     if 0 in df.index:
         df = df.drop(index=0)
 
@@ -103,6 +132,9 @@ def process_excel(file):
 
     final_df = final_df.drop(columns=["IN", "OUT"], errors="ignore")
 
+    # tekrar eden isim / ID / tarih metinleri → category (hücre başına string yok)
+    final_df = final_df.astype({c: "category" for c in PROCARE_CATEGORY_COLUMNS})
+
     # 🔥 SADECE BU EKLENDİ
 
     return final_df, header_rows
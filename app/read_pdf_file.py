@@ -1,5 +1,13 @@
 import fitz  # PyMuPDF
+import io
+import itertools
+import mmap
+import os
 import re
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
 import pandas as pd
 
 
@@ -22,93 +30,258 @@ def parse_amount(value):
         return 0.0
 
 
-def extract_name(lines, start_idx):
+# --------------------------------------------------
+# Satır tokenizer'ı: her satır tek seferde, ilk karaktere göre dispatch edilir
+#   CASE/PERSON: içeren satır        → CASE    (case, NAME: sonrası / None)
+#   boş satır                         → NUMBERS ()
+#   rakamla başlamayan satır          → OTHER
+#   tamamen sayılardan oluşan satır   → NUMBERS (ilk iki sayı, float)
+#   dd/dd/dddd ile başlayan satır     → DATE    (satırın kendisi)
+# Tarih / tutar satırları dökümde çok tekrarlandığı için sonuç cache'lenir.
+# --------------------------------------------------
+CASE, DATE, NUMBERS, OTHER = range(4)
+
+DATE_PATTERN = re.compile(r"\d{2}/\d{2}/\d{4}")
+NUMBERS_PATTERN = re.compile(r"\d+(?:[.,]\d{1,2})?(?:\s+\d+(?:[.,]\d{1,2})?)*")
+
+
+@lru_cache(maxsize=1 << 14)
+def tokenize(line):
+    """strip edilmiş satır → (tür, değer)"""
+    if "CASE/PERSON:" in line:
+        case = line.split("CASE/PERSON:", 2)[1].split()[0]
+
+        at = line.find("NAME:")
+        name = line[at + len("NAME:"):].replace("NAME:", "").strip() if at >= 0 else None
+        return CASE, (case, name)
+
+    if not line:
+        return NUMBERS, ()
+    if not line[0].isdecimal():
+        return OTHER, None
+    if NUMBERS_PATTERN.fullmatch(line):
+        # doğrulanmış sayılar (tek ayraç): parse_amount ile aynı sonuç
+        return NUMBERS, tuple(map(float, line.replace(",", ".").split()[:2]))
+    if DATE_PATTERN.match(line):
+        return DATE, line
+    return OTHER, None
+
+
+def group_record(name, case, date, numbers):
+    """Kapanan grup (tarih satırı + ilk iki sayı) → [isim, case, tarih, copay, amount]"""
+    copay = numbers[0] if len(numbers) > 0 else 0.0
+    amount = numbers[1] if len(numbers) > 1 else 0.0
+    return [name, case, date, copay, amount]
+
+
+def page_records(text, name, case):
+    """
+    Tek sayfanın metni → (kayıtlar, sayfa sonundaki isim, case).
+    name, case: önceki sayfadan taşınan bağlam (bilinmiyorsa None)
+
+    Satırlar tek geçişte, geri dönmeden işlenir. Durum:
+      name_parts: NAME devam satırları toplanıyor (boş / rakamla veya
+                  SWIPE ile başlayan satıra kadar; o satır normal işlenir)
+      date:       açık grubun tarih satırı (None → açık grup yok)
+      numbers:    açık grubun ilk iki sayısı
+    Açık grup sonraki tarih satırında, sayı olmayan bir satırda veya
+    sayfa sonunda kapanır.
+    """
+    records = []
+    name_parts = None
+    date = None
+    numbers = ()
+
+    for line in map(str.strip, text.splitlines()):
+        if name_parts is not None:
+            if line and not line[0].isdecimal() and line.split()[0].upper() != "SWIPE":
+                name_parts.append(line)
+                continue
+            name = " ".join(name_parts).strip()
+            name_parts = None
+
+        kind, value = tokenize(line)
+
+        if kind == CASE:
+            case, name_start = value
+            if name_start is not None:
+                name_parts = [name_start]
+
+        elif kind == DATE:
+            if date is not None:
+                records.append(group_record(name, case, date, numbers))
+            date, numbers = value, ()
+
+        elif date is not None:
+            if kind == NUMBERS:
+                if len(numbers) < 2:
+                    numbers = (numbers + value)[:2]
+            else:
+                records.append(group_record(name, case, date, numbers))
+                date = None
+
+    if name_parts is not None:
+        name = " ".join(name_parts).strip()
+
+    # Sayfa sonundaki bloğu yazdır
+    if date is not None:
+        records.append(group_record(name, case, date, numbers))
+
+    return records, name, case
+
+
+# --------------------------------------------------
+# Doküman kaynağı: yol → MuPDF dosyayı kendisi okur; bellekteki veri
+# (bytes / BytesIO / dosya nesnesi) memoryview / mmap üzerinden kopyasız
+# --------------------------------------------------
+PDF_COLUMNS = ["FULL NAME", "CASE/PERSON", "SWIPE DATE", "COPAY AP", "AMOUNT PAID"]
+
+# DataFrame'e toplu çevrilen kayıt sayısı (kayıt listesi bu kadar büyür)
+PDF_FRAME_ROWS = 50_000
+
+
+def is_path(source):
+    return isinstance(source, (str, os.PathLike))
+
+
+def pdf_buffer(source):
+    """bytes / BytesIO / dosya nesnesi → kopyasız buffer (bytes veya memoryview)"""
+    if isinstance(source, (bytes, memoryview)):
+        return source
+    if hasattr(source, "getbuffer"):
+        return source.getbuffer()
+
+    try:
+        fileno = source.fileno()
+    except (AttributeError, OSError, io.UnsupportedOperation):
+        return source.read()
+
+    return memoryview(mmap.mmap(fileno, 0, access=mmap.ACCESS_READ))
+
+
+# --------------------------------------------------
+# Sayfa sayfa parse + sıralı birleştirme (stitch)
+# Sayfalar arası taşınan tek durum isim / case'tir: açık grup her sayfa
+# sonunda zaten yazılır, NAME devam satırları sayfa sonunda kesilir.
+# --------------------------------------------------
+PDF_PROCESS_MIN_PAGES = 64
+
+
+def iter_pages(pdf, start, stop):
+    """
+    pdf: açık fitz dokümanı
+    start, stop: parse edilecek sayfa aralığı [start, stop)
+    yield: sayfa başına (kayıtlar, sayfa sonundaki isim, sayfa sonundaki case)
+
+    Aralıktaki ilk CASE/PERSON / NAME satırından önceki kayıtlar bir önceki
+    aralığın bağlamına aittir; isim / case None bırakılır, stitch doldurur.
+    Aralıkta henüz görülmeyen isim / case için de None döner.
+    """
+    name, case = None, None
+
+    for page in pdf.pages(start, stop):
+        records, name, case = page_records(page.get_text(), name, case)
+        yield records, name, case
+
+
+def parse_chunk(path, start, stop):
+    """
+    Worker process: dosyadan [start, stop) sayfalarını parse eder.
+    return: (kayıtlar, son isim, son case) — stitch için tek chunk
+    """
+    data, name, case = [], None, None
+    with fitz.open(path) as pdf:
+        for records, name, case in iter_pages(pdf, start, stop):
+            data.extend(records)
+
+    return data, name, case
+
+
+def stitch(chunks):
+    """
+    Chunk (sayfa veya sayfa aralığı) sonuçlarını sırasıyla birleştirir;
+    baştaki sahipsiz kayıtlar bir önceki chunk'tan taşınan isim / case ile
+    doldurulur (sıralı parse ile birebir aynı: başlangıç durumu "").
+    yield: kayıt ([isim, case, tarih, copay, amount])
+    """
+    name, case = "", ""
+
+    for records, last_name, last_case in chunks:
+        for row in records:
+            if row[0] is None:
+                row[0] = name
+            if row[1] is None:
+                row[1] = case
+            yield row
+
+        if last_name is not None:
+            name = last_name
+        if last_case is not None:
+            case = last_case
+
+
+def iter_records(source, workers=None):
     """
-    lines: sayfadaki satırlar
-    start_idx: NAME: satırının indeksi
-    return: full_name, next_line_index
+    source: dosya yolu, bytes / memoryview, BytesIO veya dosya nesnesi
+    workers: sayfa aralıklarını parse edecek process sayısı
+             (None → çekirdek sayısı). Az sayfalı PDF'ler veya tek çekirdek
+             için process açılmaz, sayfalar akış halinde parse edilir.
+    yield: kayıtlar, sayfa sırasıyla
+
+    Worker'lar dokümanı dosya yolundan açar; bellekteki veri bir kez geçici
+    dosyaya yazılır (her worker'a ayrı kopya gönderilmez).
     """
-    name_line = lines[start_idx].replace("NAME:", "").strip()
-    idx = start_idx + 1
+    if is_path(source):
+        path, buffer = source, None
+        pdf = fitz.open(source)
+    else:
+        path, buffer = None, pdf_buffer(source)
+        pdf = fitz.open(stream=buffer, filetype="pdf")
+
+    with pdf:
+        n_pages = pdf.page_count
+
+        if workers is None:
+            workers = os.cpu_count() or 1
+        workers = max(1, min(workers, n_pages // PDF_PROCESS_MIN_PAGES))
+
+        if workers < 2:
+            yield from stitch(iter_pages(pdf, 0, n_pages))
+            return
 
-    while idx < len(lines):
-        next_line = lines[idx].strip()
-        if next_line == "" or re.match(r"^\d", next_line) or next_line.split()[0].upper() == "SWIPE":
+    size = -(-n_pages // workers)
+    starts = list(range(0, n_pages, size))
+    stops = [min(s + size, n_pages) for s in starts]
+
+    try:
+        if path is None:
+            with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as tmp:
+                tmp.write(buffer)
+                path = tmp.name
+
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            yield from stitch(pool.map(parse_chunk, [path] * len(starts), starts, stops))
+    finally:
+        if buffer is not None and path is not None:
+            os.remove(path)
+
+
+def records_frame(records, chunk_rows=PDF_FRAME_ROWS):
+    """Kayıt akışı → DataFrame; kayıtlar chunk_rows'luk parçalar halinde çevrilir"""
+    frames = []
+    while True:
+        chunk = list(itertools.islice(records, chunk_rows))
+        if not chunk:
             break
-        name_line += " " + next_line
-        idx += 1
-
-    return name_line.strip(), idx
-
-
-def process_pdf(file):
-    pdf = fitz.open(stream=file.read(), filetype="pdf")
-
-    date_pattern = re.compile(r"^\d{2}/\d{2}/\d{4}")
-    number_pattern = re.compile(r"^\d+(?:[.,]\d{1,2})?$")
-
-    current_name = ""
-    current_case = ""
-    current_group = []
-
-    data = []
-
-    for page in pdf:
-        lines = page.get_text().splitlines()
-        i = 0
-        while i < len(lines):
-            line = lines[i].strip()
-
-            # CASE/PERSON satırı
-            if "CASE/PERSON:" in line:
-                part1 = line.split("CASE/PERSON:")[1].strip()
-                current_case = part1.split()[0]
-
-                if "NAME:" in line:
-                    idx_name = line.find("NAME:") + len("NAME:")
-                    lines[i] = line[idx_name:].strip()
-                    current_name, j = extract_name(lines, i)
-                    i = j - 1
-
-            # Tarih satırı
-            elif date_pattern.match(line):
-                if current_group:
-                    numbers = [x for x in current_group[1:] if number_pattern.match(x)]
-                    numbers_to_print = numbers[:2]
-                    copay = parse_amount(numbers_to_print[0]) if len(numbers_to_print) > 0 else 0.0
-                    amount = parse_amount(numbers_to_print[1]) if len(numbers_to_print) > 1 else 0.0
-                    data.append([current_name, current_case, current_group[0], copay, amount])
-                    current_group = []
-                current_group.append(line)
-
-            # Tarihten sonraki sayılar
-            elif current_group:
-                if all(number_pattern.match(x) for x in line.split()):
-                    current_group.extend(line.split())
-                else:
-                    if current_group:
-                        numbers = [x for x in current_group[1:] if number_pattern.match(x)]
-                        numbers_to_print = numbers[:2]
-                        copay = parse_amount(numbers_to_print[0]) if len(numbers_to_print) > 0 else 0.0
-                        amount = parse_amount(numbers_to_print[1]) if len(numbers_to_print) > 1 else 0.0
-                        data.append([current_name, current_case, current_group[0], copay, amount])
-                        current_group = []
-
-            i += 1
-
-        # Sayfa sonundaki bloğu yazdır
-        if current_group:
-            numbers = [x for x in current_group[1:] if number_pattern.match(x)]
-            numbers_to_print = numbers[:2]
-            copay = parse_amount(numbers_to_print[0]) if len(numbers_to_print) > 0 else 0.0
-            amount = parse_amount(numbers_to_print[1]) if len(numbers_to_print) > 1 else 0.0
-            data.append([current_name, current_case, current_group[0], copay, amount])
-            current_group = []
-
-    df = pd.DataFrame(
-        data,
-        columns=["FULL NAME", "CASE/PERSON", "SWIPE DATE", "COPAY AP", "AMOUNT PAID"]
-    )
+        frames.append(pd.DataFrame(chunk, columns=PDF_COLUMNS))
+
+    if not frames:
+        return pd.DataFrame(columns=PDF_COLUMNS)
+    return pd.concat(frames, ignore_index=True)
+
+
+def process_pdf(file, workers=None):
+    df = records_frame(iter_records(file, workers=workers))
 
     print("✔ PDF işlendi. Toplam satır:", len(df))
 
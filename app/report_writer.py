@@ -0,0 +1,158 @@
+import pandas as pd
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Border, Side
+from openpyxl.styles.fills import Fill, PatternFill
+from openpyxl.utils import get_column_letter
+
+THICK_BORDER = Border(
+    left=Side(style="medium"),
+    right=Side(style="medium"),
+    top=Side(style="medium"),
+    bottom=Side(style="medium"),
+)
+
+CENTER = Alignment(horizontal="center", vertical="center")
+
+# xlsx tekrar okunduğunda 14.0 → 14 görünür; genişlik de buna göre
+INTEGRAL_FLOAT = r"^(-?\d+)\.0$"
+
+
+# --------------------------------------------------
+# Hücre değeri (to_excel ile aynı: NaN / None → "")
+# --------------------------------------------------
+def excel_value(val):
+    if val is None or (not isinstance(val, str) and pd.isna(val)):
+        return ""
+    return val
+
+
+def column_widths(df, banner_rows, merge_width, padding=4):
+    """
+    Kolon genişliklerini satırlar yazılmadan ÖNCE, DataFrame'den hesaplar.
+    Tablo kolonları vektörel string uzunluğu maksimumu ile (kolon başına
+    tek geçiş) ölçülür; merge edilmiş banner hücreleri (1..merge_width)
+    ayrıca ele alınır ve hesaba katılmaz.
+    """
+    n_cols = max([len(df.columns)] + [len(row) for row in banner_rows])
+    widths = [0] * n_cols
+
+    # ---------- BANNER (merge dışı hücreler) ----------
+    for row in banner_rows:
+        for c, val in enumerate(row):
+            if c < merge_width or val is None or pd.isna(val):
+                continue
+            if val:
+                widths[c] = max(widths[c], len(str(val)))
+
+    # ---------- TABLO (header + değerler) ----------
+    for c, name in enumerate(df.columns):
+        text = (
+            df.iloc[:, c]
+            .dropna()
+            .astype(str)
+            .str.replace(INTEGRAL_FLOAT, r"\1", regex=True)
+        )
+        longest = int(text.str.len().max()) if len(text) else 0
+
+        widths[c] = max(widths[c], len(str(name)) if name else 0, longest)
+
+    return [w + padding for w in widths]
+
+
+def write_report(target, df, banner_rows, merge_width, **options):
+    """
+    Tek sayfalık raporu write-only modda TEK GEÇİŞTE yazar.
+    target: dosya yolu veya BytesIO; diğer argümanlar write_sheet ile aynı.
+    """
+    wb = Workbook(write_only=True)
+    write_sheet(wb, "Sheet1", df, banner_rows, merge_width, **options)
+    save_workbook(wb, target)
+
+
+def save_workbook(wb, target):
+    # Fix for Python 3.14 + openpyxl compatibility
+    wb._fills = [
+        f if isinstance(f, Fill) else PatternFill()
+        for f in wb._fills
+    ]
+
+    wb.save(target)
+
+
+def write_sheet(
+    wb,
+    title,
+    df,
+    banner_rows,
+    merge_width,
+    fills=None,
+    banner_font=None,
+    padding=4
+):
+    """
+    write-only workbook'a bir sayfa ekler ve satırları akış halinde yazar.
+
+    wb: Workbook(write_only=True)
+    title: sayfa adı
+    df: rapor tablosu (header satırı + veri)
+    banner_rows: tablonun üstündeki 3 satırın değerleri (list of lists)
+    merge_width: banner satırlarının A'dan itibaren merge edileceği kolon sayısı
+    fills: {kolon adı: satır başına PatternFill / None listesi}
+    banner_font: banner hücrelerinin fontu (None → varsayılan)
+
+    Genişlikler, merge'ler ve stiller satırlar yazılmadan önce belirlenir;
+    to_excel → load_workbook → insert_rows → save döngüsü yok.
+    """
+    fills = fills or {}
+
+    ws = wb.create_sheet(title)
+
+    # ===== COLUMN WIDTHS =====
+    widths = column_widths(df, banner_rows, merge_width, padding=padding)
+    for c, width in enumerate(widths, start=1):
+        ws.column_dimensions[get_column_letter(c)].width = width
+
+    # ===== MERGE FIRST 3 ROWS =====
+    for r in range(1, len(banner_rows) + 1):
+        ws.merged_cells.add(f"A{r}:{get_column_letter(merge_width)}{r}")
+
+    # ===== BANNER =====
+    for row in banner_rows:
+        cells = []
+        for c, val in enumerate(row):
+            if c == 0:
+                cell = WriteOnlyCell(ws, value=excel_value(val))
+                cell.alignment = CENTER
+            elif c < merge_width or val is None or pd.isna(val):
+                cells.append(None)
+                continue
+            else:
+                cell = WriteOnlyCell(ws, value=val)
+
+            if banner_font is not None:
+                cell.font = banner_font
+            cells.append(cell)
+
+        ws.append(cells)
+
+    # ===== HEADER =====
+    header = []
+    for name in df.columns:
+        cell = WriteOnlyCell(ws, value=name)
+        cell.border = THICK_BORDER
+        header.append(cell)
+    ws.append(header)
+
+    # ===== ROWS (THICK BORDER + FILLS) =====
+    fill_columns = [fills.get(name) for name in df.columns]
+
+    for i, values in enumerate(df.itertuples(index=False, name=None)):
+        cells = []
+        for val, col_fills in zip(values, fill_columns):
+            cell = WriteOnlyCell(ws, value=excel_value(val))
+            cell.border = THICK_BORDER
+            if col_fills is not None and col_fills[i] is not None:
+                cell.fill = col_fills[i]
+            cells.append(cell)
+        ws.append(cells)
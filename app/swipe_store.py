@@ -0,0 +1,173 @@
+import sqlite3
+
+import pandas as pd
+
+from app.dhs_processor import FLAG_COLUMNS, FLAGS_DTYPE, RESPONSE_COLUMNS, TIME_COLUMNS
+from app.time_utils import MINUTES_DTYPE
+
+# --------------------------------------------------
+# DHS swipe deposu (SQLite, sadece ekleme)
+# Her export'un sadece daha önce görülmemiş işlemleri eklenir;
+# tekillik anahtarı: (Case #, Person, Date Time, Trans Type)
+# --------------------------------------------------
+SWIPE_KEY_COLUMNS = ["Case #", "Person", "Date Time", "Trans Type"]
+SWIPE_COLUMNS = ["Person Name", "Case #", "Person", "Date Time", "Trans Type", "Response"]
+
+# (StudentID, Date) başına normalize edilmiş DHS satırı (normalize_dhs çıktısı)
+DAILY_COLUMNS = [
+    "StudentID", "Date", "FullName", *TIME_COLUMNS, *RESPONSE_COLUMNS, *FLAG_COLUMNS
+]
+INTEGER_COLUMNS = TIME_COLUMNS + FLAG_COLUMNS
+
+
+def quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+def open_store(path):
+    """
+    Depoyu açar, tablolar yoksa oluşturur.
+    swipes tablosu örtük rowid'i korur (ekleme sırası); swipe_key sadece
+    UNIQUE — PRIMARY KEY olsaydı rowid'in yerine geçer, satırlar hash
+    sırasıyla okunurdu.
+    """
+    conn = sqlite3.connect(path)
+
+    swipe_cols = ", ".join(f"{quote(c)} TEXT" for c in SWIPE_COLUMNS)
+    daily_cols = ", ".join(
+        f"{quote(c)} {'INTEGER' if c in INTEGER_COLUMNS else 'TEXT'}"
+        for c in DAILY_COLUMNS
+    )
+
+    conn.executescript(f"""
+        CREATE TABLE IF NOT EXISTS swipes (
+            swipe_key INTEGER UNIQUE,
+            StudentID TEXT,
+            Date TEXT,
+            {swipe_cols}
+        );
+        CREATE INDEX IF NOT EXISTS swipes_student_date ON swipes (StudentID, Date);
+        CREATE INDEX IF NOT EXISTS swipes_date ON swipes (Date);
+
+        CREATE TABLE IF NOT EXISTS dhs_daily (
+            {daily_cols},
+            PRIMARY KEY (StudentID, Date)
+        );
+    """)
+
+    return conn
+
+
+def swipe_frame(df_raw):
+    """
+    Ham export → depo satırları: anahtar hash'i + (StudentID, Date).
+    StudentID / Date türetmesi process_dhs + daily normalize ile aynı;
+    tarihi parse edilemeyen satırlar (process_dhs zaten atar) alınmaz.
+    """
+    df = df_raw.copy()
+    df.columns = df.columns.str.strip()
+    df = df.reindex(columns=SWIPE_COLUMNS)
+
+    date_time = pd.to_datetime(df["Date Time"], errors="coerce")
+    df = df[date_time.notna()]
+
+    df.insert(0, "Date", date_time[date_time.notna()].dt.strftime("%m/%d/%Y"))
+    df.insert(0, "StudentID", (df["Case #"].str.strip() + "/" + df["Person"]).str.strip())
+    df.insert(
+        0,
+        "swipe_key",
+        pd.util.hash_pandas_object(df[SWIPE_KEY_COLUMNS], index=False)
+        .to_numpy()
+        .view("int64")
+    )
+
+    return df.drop_duplicates("swipe_key")
+
+
+def sql_rows(df):
+    """DataFrame → sqlite parametreleri (NaN / <NA> → NULL)"""
+    values = df.astype(object)
+    return values.where(values.notna(), None).itertuples(index=False, name=None)
+
+
+def ingest_swipes(conn, df_raw):
+    """
+    Export'u depoya ekler; sadece görülmemiş işlemler yazılır.
+    return: (yeni satırlar, export'taki günler)
+    """
+    swipes = swipe_frame(df_raw)
+    dates = sorted(swipes["Date"].unique())
+
+    # Sadece export'un günlerindeki mevcut anahtarlar okunur
+    marks = ", ".join("?" * len(dates))
+    seen = pd.read_sql_query(
+        f"SELECT swipe_key FROM swipes WHERE Date IN ({marks})", conn, params=dates
+    )["swipe_key"]
+
+    new = swipes[~swipes["swipe_key"].isin(seen)]
+
+    columns = ", ".join(quote(c) for c in new.columns)
+    marks = ", ".join("?" * len(new.columns))
+    with conn:
+        conn.executemany(
+            f"INSERT OR IGNORE INTO swipes ({columns}) VALUES ({marks})",
+            sql_rows(new)
+        )
+
+    return new, dates
+
+
+def stage_keys(conn, keys):
+    """(StudentID, Date) anahtarlarını geçici tabloya yazar (join için)"""
+    conn.execute("CREATE TEMP TABLE IF NOT EXISTS staged_keys (StudentID TEXT, Date TEXT)")
+    conn.execute("DELETE FROM staged_keys")
+    conn.executemany("INSERT INTO staged_keys VALUES (?, ?)", sql_rows(keys))
+
+
+def load_swipes(conn, keys):
+    """
+    Verilen (StudentID, Date) anahtarlarının TÜM işlemleri (ham export kolonları),
+    depoya eklenme sırasıyla (process_dhs aynı dakikadaki swipe'larda sıraya bakar)
+    """
+    stage_keys(conn, keys)
+    columns = ", ".join(f"s.{quote(c)}" for c in SWIPE_COLUMNS)
+
+    return pd.read_sql_query(
+        f"""
+        SELECT {columns} FROM swipes s
+        JOIN staged_keys k ON s.StudentID = k.StudentID AND s.Date = k.Date
+        ORDER BY s.rowid
+        """,
+        conn
+    )
+
+
+def save_daily(conn, keys, dhs):
+    """Anahtarların normalize DHS satırlarını yeniler (önce silinir, sonra yazılır)"""
+    columns = ", ".join(quote(c) for c in DAILY_COLUMNS)
+    marks = ", ".join("?" * len(DAILY_COLUMNS))
+
+    with conn:
+        stage_keys(conn, keys)
+        conn.execute(
+            "DELETE FROM dhs_daily WHERE (StudentID, Date) IN "
+            "(SELECT StudentID, Date FROM staged_keys)"
+        )
+        conn.executemany(
+            f"INSERT INTO dhs_daily ({columns}) VALUES ({marks})",
+            sql_rows(dhs.reindex(columns=DAILY_COLUMNS))
+        )
+
+
+def load_daily(conn, dates):
+    """Günlerin normalize DHS satırları, normalize_dhs sırasıyla (StudentID, Date)"""
+    marks = ", ".join("?" * len(dates))
+    dhs = pd.read_sql_query(
+        f"SELECT * FROM dhs_daily WHERE Date IN ({marks}) ORDER BY StudentID, Date",
+        conn,
+        params=list(dates)
+    )
+    dhs[TIME_COLUMNS] = dhs[TIME_COLUMNS].astype(MINUTES_DTYPE)
+    dhs[FLAG_COLUMNS] = dhs[FLAG_COLUMNS].astype(FLAGS_DTYPE)
+
+    return dhs
@@ -0,0 +1,52 @@
+import pandas as pd
+
+# --------------------------------------------------
+# Saatler pipeline içinde "gece yarısından beri dakika" (Int16) olarak taşınır.
+# "HH:MM" metnine sadece rapor yazılırken çevrilir.
+# --------------------------------------------------
+MINUTES_DTYPE = "Int16"
+
+CLOCK_PATTERN = r"(\d{1,2}):(\d{2})\s*(AM|PM)"
+
+
+def minutes(hhmm):
+    """ "HH:MM" → dakika (int) """
+    hour, minute = hhmm.split(":")
+    return int(hour) * 60 + int(minute)
+
+
+def datetime_minutes(dt):
+    """datetime Series → dakika, NaT → <NA>"""
+    return (dt.dt.hour * 60 + dt.dt.minute).astype(MINUTES_DTYPE)
+
+
+def clock_minutes(text):
+    """
+    "07:05 AM" / "7:05PM" metinleri → dakika, geçersiz → <NA>.
+    12 AM → 00:xx, 12 PM → 12:xx, 0:xx AM/PM → 00:xx (to_datetime ile aynı).
+    """
+    parts = text.str.extract(CLOCK_PATTERN)
+
+    hour = pd.to_numeric(parts[0]).astype(MINUTES_DTYPE)
+    minute = pd.to_numeric(parts[1]).astype(MINUTES_DTYPE)
+    pm = (parts[2] == "PM") & (hour != 0)
+
+    total = (hour % 12 + pm.astype(MINUTES_DTYPE) * 12) * 60 + minute
+
+    valid = (hour <= 12) & (minute <= 59)
+    return total.where(valid.fillna(False)).astype(MINUTES_DTYPE)
+
+
+def format_minutes(values):
+    """dakika → "HH:MM", eksik → "" """
+    values = pd.Series(values)
+    valid = values.notna()
+
+    text = pd.Series("", index=values.index, dtype=object)
+    if valid.any():
+        v = values[valid].astype(int)
+        text[valid] = (
+            (v // 60).astype(str).str.zfill(2) + ":" + (v % 60).astype(str).str.zfill(2)
+        )
+
+    return text